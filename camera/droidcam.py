@@ -18,7 +18,9 @@ class DroidCamHandler:
         """
         self.droidcam_url = droidcam_url
         self.frame = None
+        self.frame_seq = 0  # Incremented for every decoded frame
         self.lock = threading.Lock()
+        self._frame_ready = threading.Condition(self.lock)  # Notified on each new frame and on stop
         self.is_running = False
         self.thread = None
         self.is_connected = False
@@ -151,8 +153,10 @@ class DroidCamHandler:
                                 frame = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
                                 
                                 if frame is not None:
-                                    with self.lock:
+                                    with self._frame_ready:
                                         self.frame = frame
+                                        self.frame_seq += 1
+                                        self._frame_ready.notify_all()
                                     frames_received += 1
                                     consecutive_decode_errors = 0
                                     
@@ -201,6 +205,8 @@ class DroidCamHandler:
         
         self.is_running = False
         self.is_connected = False
+        with self._frame_ready:
+            self._frame_ready.notify_all()
         logger.info(f"DroidCam stream ended. Total frames: {frames_received}, Reconnect attempts: {reconnect_attempts}")
     
     def get_frame(self):
@@ -210,9 +216,30 @@ class DroidCamHandler:
                 return self.frame.copy()
         return None
     
+    def wait_for_frame(self, last_seq, timeout=1.0, copy=True):
+        """
+        Wait for a frame newer than `last_seq`
+        
+        Args:
+            last_seq: frame_seq of the last frame the caller processed (0 for none)
+            timeout: Max seconds to wait
+            copy: Return a private copy. With False the shared frame is returned -
+                the reader replaces it on every decode, but callers must not modify it
+            
+        Returns:
+            Tuple of (frame or None on timeout/stop, frame_seq)
+        """
+        with self._frame_ready:
+            self._frame_ready.wait_for(lambda: self.frame_seq != last_seq or not self.is_running, timeout)
+            if self.frame_seq == last_seq or self.frame is None:
+                return None, last_seq
+            return (self.frame.copy() if copy else self.frame), self.frame_seq
+    
     def stop(self):
         """Stop reading frames"""
         self.is_running = False
+        with self._frame_ready:
+            self._frame_ready.notify_all()
         if self.thread:
             self.thread.join(timeout=5)
         self.is_connected = False
@@ -1,5 +1,6 @@
 import cv2
 import threading
+import queue
 import numpy as np
 import json
 import csv
@@ -275,10 +276,20 @@ def gen_frames():
         if frame is None:
             continue
         
-        # Apply YOLO detection if enabled
-        if camera.detector_enabled and camera.detector.is_loaded:
-            # Use enhanced detection with ROI and tracking
-            frame, direction_counts, tracked_objects = camera.detector.detect_vehicles(frame, draw_roi=True)
+        detection_on = camera.detector_enabled and camera.detector.is_loaded
+        
+        if detection_on and traffic_controller and not traffic_controller.should_run_detection():
+            # SIMPLE-mode GREEN can't change on this frame - skip inference and
+            # redraw the last detections; the previous counts stay in effect
+            frame, _, _ = camera.detector.detect_vehicles(
+                frame, draw_roi=True, mutate_in_place=True, reuse_detections=True
+            )
+        elif detection_on:
+            # Apply YOLO detection with ROI and tracking
+            # (get_frame() already returns a private copy - draw on it directly)
+            frame, direction_counts, tracked_objects = camera.detector.detect_vehicles(
+                frame, draw_roi=True, mutate_in_place=True
+            )
             
             # Update car count
             with camera.lock:
@@ -623,7 +634,9 @@ def start_droidcam(request):
             
             if success:
                 # Load pedestrian detector model (shared with main YOLO)
-                pedestrian_detector.load_model()
+                # YOLO runs on its own thread so the feed keeps up with the camera
+                # (droidcam_feed calls detect_gesture once per new DroidCam frame)
+                pedestrian_detector.load_model(async_inference=True)
                 
                 return JsonResponse({
                     'success': True,
@@ -641,11 +654,30 @@ def start_droidcam(request):
     return JsonResponse({'error': 'POST request required'}, status=400)
 
 
+def _put_latest(mailbox, item):
+    """Put item into a 1-slot queue, replacing any stale item (never blocks)"""
+    try:
+        mailbox.put_nowait(item)
+    except queue.Full:
+        try:
+            mailbox.get_nowait()
+        except queue.Empty:
+            pass
+        mailbox.put_nowait(item)
+
+
 def droidcam_feed(request):
     """Stream DroidCam video feed with pedestrian gesture detection"""
-    def gen_droidcam_frames():
-        while droidcam.is_running:
-            frame = droidcam.get_frame()
+    def detection_worker(mailbox, stop_event):
+        """Run gesture detection and hand annotated frames to the encoder (drops stale frames)"""
+        seq = 0
+        while droidcam.is_running and not stop_event.is_set():
+            # Block until DroidCam decodes a new frame - never re-process the same one.
+            # This also paces detect_gesture() at the camera rate, which its gesture
+            # history (~2 s at 30 fps) assumes now that inference is asynchronous.
+            # The shared frame is read-only: detect_gesture() draws on its own copy
+            # and hands the original to the inference worker, one copy per frame
+            frame, seq = droidcam.wait_for_frame(seq, timeout=0.5, copy=False)
             
             if frame is None:
                 continue
@@ -663,15 +695,33 @@ def droidcam_feed(request):
                 
                 frame = annotated_frame
             
-            # Encode frame
-            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 75])
-            
-            if ret:
-                frame_bytes = buffer.tobytes()
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n'
-                       b'Content-Length: ' + str(len(frame_bytes)).encode() + b'\r\n\r\n' +
-                       frame_bytes + b'\r\n')
+            _put_latest(mailbox, frame)
+    
+    def gen_droidcam_frames():
+        # JPEG encoding runs here (the streaming thread) so it never stalls detection
+        mailbox = queue.Queue(maxsize=1)
+        stop_event = threading.Event()
+        worker = threading.Thread(target=detection_worker, args=(mailbox, stop_event), daemon=True)
+        worker.start()
+        
+        try:
+            while droidcam.is_running:
+                try:
+                    frame = mailbox.get(timeout=1.0)
+                except queue.Empty:
+                    continue
+                
+                # Encode frame
+                ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 75])
+                
+                if ret:
+                    frame_bytes = buffer.tobytes()
+                    yield (b'--frame\r\n'
+                           b'Content-Type: image/jpeg\r\n'
+                           b'Content-Length: ' + str(len(frame_bytes)).encode() + b'\r\n\r\n' +
+                           frame_bytes + b'\r\n')
+        finally:
+            stop_event.set()
     
     return StreamingHttpResponse(
         gen_droidcam_frames(),
@@ -737,9 +787,9 @@ def droidcam_pedestrian_mode(request):
     try:
         # Use the main camera's detector to detect cars in DroidCam frame
         if camera and camera.detector:
-            results = camera.detector.model(frame, verbose=False, conf=0.4)
+            results = camera.detector.model(frame, verbose=False, conf=0.4, imgsz=camera.detector.INFERENCE_IMGSZ)
             
-            if results and len(results) > 0:
+            if results:
                 result = results[0]
                 
                 # Count cars, trucks, buses, motorcycles (COCO classes: 2=car, 5=bus, 7=truck, 3=motorcycle)
@@ -1681,17 +1731,18 @@ def predict_next_hour(request):
     from detection.models import VehicleCount, HourlyStats, TrafficPrediction
     from django.utils import timezone
     from django.db.models import Avg
-    from datetime import timedelta, datetime
+    from datetime import timedelta
     import statistics
     
     now = timezone.now()
-    next_hour = now.hour + 1 if now.hour < 23 else 0
+    # Top of the next hour (rolls over to tomorrow after 23:00)
+    prediction_time = (now + timedelta(hours=1)).replace(minute=0, second=0, microsecond=0)
+    next_hour = prediction_time.hour
     
     # Get historical data for the same hour over past weeks
     same_hour_data = []
     for weeks_back in range(1, 5):  # Last 4 weeks
-        target_time = now - timedelta(weeks=weeks_back)
-        hour_start = target_time.replace(hour=next_hour, minute=0, second=0, microsecond=0)
+        hour_start = prediction_time - timedelta(weeks=weeks_back)
         hour_end = hour_start + timedelta(hours=1)
         
         data = VehicleCount.objects.filter(
@@ -1740,10 +1791,6 @@ def predict_next_hour(request):
     total = pred_north + pred_east + pred_south + pred_west
     
     # Store prediction
-    prediction_time = now.replace(hour=next_hour, minute=0, second=0, microsecond=0)
-    if now.hour == 23:
-        prediction_time += timedelta(days=1)
-    
     try:
         TrafficPrediction.objects.create(
             prediction_for=prediction_time,
@@ -1774,6 +1821,13 @@ def predict_next_hour(request):
     })
 
 
+def _top_of_current_hour(request):
+    """Last-Modified for hourly predictions - lets dashboard polls get a 304"""
+    from django.utils import timezone
+    return timezone.now().replace(minute=0, second=0, microsecond=0)
+
+
+@condition(last_modified_func=_top_of_current_hour)
 def predict_daily(request):
     """
     Predict traffic for the next 24 hours
@@ -1782,20 +1836,24 @@ def predict_daily(request):
     from django.utils import timezone
     from django.db.models import Avg
     from datetime import timedelta
+    import heapq
     import statistics
     
     now = timezone.now()
+    base = now.replace(minute=0, second=0, microsecond=0)
+    one_hour = timedelta(hours=1)
+    one_week = timedelta(weeks=1)
     predictions = []
     
     for hour_offset in range(1, 25):
-        target_hour = (now.hour + hour_offset) % 24
+        slot = base + hour_offset * one_hour
+        target_hour = slot.hour
         
         # Get historical data for this hour (last 4 weeks)
         same_hour_data = []
         for weeks_back in range(1, 5):
-            target_time = now - timedelta(weeks=weeks_back)
-            hour_start = target_time.replace(hour=target_hour, minute=0, second=0, microsecond=0)
-            hour_end = hour_start + timedelta(hours=1)
+            hour_start = slot - weeks_back * one_week
+            hour_end = hour_start + one_hour
             
             data = VehicleCount.objects.filter(
                 timestamp__gte=hour_start,
@@ -1824,13 +1882,15 @@ def predict_daily(request):
             'confidence': round(confidence, 2)
         })
     
-    # Find predicted peak hours
-    sorted_pred = sorted(predictions, key=lambda x: x['predicted_total'], reverse=True)
+    # Find predicted peak/quiet hours (only the top 3 of each are needed)
+    peak = heapq.nlargest(3, predictions, key=lambda x: x['predicted_total'])
+    # Quietest last, ties in hour order - same as the old sorted(..., reverse=True)[-3:]
+    quiet = heapq.nsmallest(3, reversed(predictions), key=lambda x: x['predicted_total'])[::-1]
     
     return JsonResponse({
         'predictions': predictions,
-        'peak_hours': [p['hour'] for p in sorted_pred[:3]],
-        'quiet_hours': [p['hour'] for p in sorted_pred[-3:]],
+        'peak_hours': [p['hour'] for p in peak],
+        'quiet_hours': [p['hour'] for p in quiet],
         'model': 'daily_pattern_v1',
         'generated_at': now.isoformat()
     })
@@ -0,0 +1,28 @@
+"""
+Export the vehicle detector's YOLO weights to NCNN FP16 ahead of serving
+The export pulls in ncnn/pnnx and takes a while, so it is done here once
+instead of inside the first /video_feed request. The detector picks the
+export up automatically on its next load.
+
+Run once after installing (start.sh does this too):
+    python manage.py export_ncnn
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+
+from detector.yolo_detector import YOLODetector
+
+
+class Command(BaseCommand):
+    help = 'Export the YOLO vehicle model to NCNN FP16 (no-op if already exported)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--model', default='yolov8n.pt',
+                            help='PyTorch weights to export (default: yolov8n.pt)')
+
+    def handle(self, *args, **options):
+        path = YOLODetector(model_name=options['model']).export_ncnn()
+        if path is None:
+            raise CommandError(f"Could not export {options['model']} to NCNN (is ncnn/pnnx installed?)")
+
+        self.stdout.write(self.style.SUCCESS(f"NCNN model ready at {path}"))
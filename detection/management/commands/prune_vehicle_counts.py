@@ -0,0 +1,68 @@
+"""
+Roll old VehicleCount snapshots up into HourlyStats and delete the raw rows
+Keeps the raw table (and its timestamp index) bounded so the 4-week
+prediction/analytics range scans stay fast regardless of total history.
+
+Run periodically (e.g. monthly from cron):
+    python manage.py prune_vehicle_counts --months 3
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import F, Sum
+from django.db.models.functions import TruncHour
+from django.utils import timezone
+
+from detection.models import VehicleCount, HourlyStats
+
+
+class Command(BaseCommand):
+    help = 'Aggregate VehicleCount rows older than N months into HourlyStats and delete them'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--months', type=int, default=3,
+                            help='Keep this many months of raw snapshots (default: 3)')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='Only report how many rows would be pruned')
+
+    def handle(self, *args, **options):
+        months = max(1, options['months'])
+        # Cut on a day boundary so every rolled-up hour is complete
+        cutoff = (timezone.now() - timedelta(days=30 * months)).replace(
+            hour=0, minute=0, second=0, microsecond=0
+        )
+        old_rows = VehicleCount.objects.filter(timestamp__lt=cutoff)
+
+        if options['dry_run']:
+            self.stdout.write(f"Would prune {old_rows.count()} rows older than {cutoff:%Y-%m-%d}")
+            return
+
+        with transaction.atomic():
+            hourly = old_rows.annotate(slot=TruncHour('timestamp')).values('slot').annotate(
+                north=Sum('north_count'),
+                east=Sum('east_count'),
+                south=Sum('south_count'),
+                west=Sum('west_count'),
+                total=Sum('total_count')
+            ).order_by('slot')
+
+            hours_rolled = 0
+            for item in hourly:
+                slot = item['slot']
+                stats, created = HourlyStats.objects.get_or_create(date=slot.date(), hour=slot.hour)
+                HourlyStats.objects.filter(pk=stats.pk).update(
+                    north_total=F('north_total') + (item['north'] or 0),
+                    east_total=F('east_total') + (item['east'] or 0),
+                    south_total=F('south_total') + (item['south'] or 0),
+                    west_total=F('west_total') + (item['west'] or 0),
+                    total_vehicles=F('total_vehicles') + (item['total'] or 0)
+                )
+                hours_rolled += 1
+
+            deleted, _ = old_rows.delete()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Rolled {hours_rolled} hours into HourlyStats and pruned {deleted} rows older than {cutoff:%Y-%m-%d}"
+        ))
@@ -42,7 +42,15 @@ class VehicleCount(models.Model):
     east_count = models.IntegerField(default=0)
     south_count = models.IntegerField(default=0)
     west_count = models.IntegerField(default=0)
-    total_count = models.IntegerField(default=0)
+    # Always north+east+south+west - computed and stored by the database
+    total_count = models.GeneratedField(
+        expression=(
+            models.F('north_count') + models.F('east_count')
+            + models.F('south_count') + models.F('west_count')
+        ),
+        output_field=models.IntegerField(),
+        db_persist=True,
+    )
     
     class Meta:
         ordering = ['-timestamp']
@@ -0,0 +1,22 @@
+"""
+Optional Numba JIT support
+Numba is not required - without it `njit` is a no-op and functions run as plain Python.
+
+Installation (optional): pip install numba
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+NUMBA_AVAILABLE = False
+
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    def njit(*args, **kwargs):
+        """No-op stand-in for numba.njit (supports @njit and @njit(...))"""
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
@@ -3,15 +3,54 @@ Pedestrian Gesture Detection System
 Detects pedestrian intent to cross using smartphone camera gesture recognition
 """
 
+import os
 import cv2
 import numpy as np
+import torch
 import logging
+import queue
+import threading
 import time
-from collections import deque
 from ultralytics import YOLO
+from detector.jit import njit
 
 logger = logging.getLogger(__name__)
 
+# Input shapes are fixed (INFERENCE_IMGSZ / ROI_IMGSZ) - let cuDNN cache the fastest kernels
+if torch.cuda.is_available():
+    torch.backends.cudnn.benchmark = True
+
+# Quadrant code from _analyze_bbox -> crossing direction
+QUADRANT_DIRECTIONS = ('NORTH', 'EAST', 'WEST', 'SOUTH')
+
+
+@njit(cache=True)
+def _analyze_bbox(x1, y1, x2, y2, h, w):
+    """
+    Proximity, center alignment and quadrant of a traffic light bbox in one pass
+    
+    Args:
+        x1, y1, x2, y2: Bounding box
+        h, w: Frame height and width
+        
+    Returns:
+        Tuple of (normalized_area, is_centered, quadrant) where quadrant indexes
+        QUADRANT_DIRECTIONS (0=top-left, 1=top-right, 2=bottom-left, 3=bottom-right)
+    """
+    # Proximity: bbox area relative to frame area
+    area = (x2 - x1) * (y2 - y1) / (h * w)
+    
+    center_x = (x1 + x2) * 0.5
+    center_y = (y1 + y2) * 0.5
+    
+    # Center alignment: within 30% of frame center on both axes
+    centered = abs(center_x - w * 0.5) / w < 0.3 and abs(center_y - h * 0.5) / h < 0.3
+    
+    # Quadrant of the bbox center
+    quadrant = (1 if center_x >= w * 0.5 else 0) + (2 if center_y >= h * 0.5 else 0)
+    
+    return area, centered, quadrant
+
 
 class PedestrianGestureDetector:
     """
@@ -37,30 +76,131 @@ class PedestrianGestureDetector:
         # Detection state
         self.gesture_start_time = None
         self.gesture_active = False
-        self.last_detection_time = 0
+        self.last_detection_time = float('-inf')
         
-        # History for persistence checking
-        self.detection_history = deque(maxlen=60)  # 2 seconds at 30fps
+        # History for persistence checking: uint8 ring buffer with a running sum
+        self.HISTORY_SIZE = 60  # 2 seconds at 30fps
+        self._hist = np.zeros(self.HISTORY_SIZE, dtype=np.uint8)
+        self._hist_idx = 0
+        self._hist_count = 0
+        self._hist_sum = 0
         
         # Thresholds
         self.PERSISTENCE_THRESHOLD = 2.0  # seconds
         self.COOLDOWN_PERIOD = 5.0  # seconds between detections
         self.PROXIMITY_THRESHOLD = 0.15  # Normalized frame area
         
-    def load_model(self, model_path='yolov8n.pt'):
-        """Load YOLO model for traffic light detection"""
+        # Full-frame inference size: frames are downscaled to this before YOLO instead
+        # of letterboxing full-resolution phone frames. Fixed so an exported TensorRT
+        # engine can use static shapes.
+        self.INFERENCE_IMGSZ = 320
+        
+        # Frame skipping / ROI tracking (consecutive phone frames are near-duplicates)
+        self.DETECT_STRIDE = 3  # Run YOLO every Nth frame, reuse last bbox in between
+        self.FULL_FRAME_INTERVAL = 30  # Full-frame re-detection (~1s at 30fps) to recover lost tracks
+        self.ROI_PADDING = 0.5  # Padding around last bbox, as a fraction of its size
+        self.ROI_IMGSZ = 320  # Inference size for the cropped ROI
+        self._frame_idx = 0
+        self._last_detection = (False, None, 0)
+        
+        # Overlay progress bar geometry (x, y, width, height)
+        self.PROGRESS_BAR = (10, 60, 400, 30)
+        
+        # Optional async inference: 1-slot latest-frame mailbox + worker thread
+        self._inbox = None
+        self._inference_thread = None
+        self._latest_detection = (False, None, 0)
+        
+    def _resolve_model_path(self, model_path):
+        """
+        Prefer a TensorRT FP16 engine next to the .pt weights
+        
+        The engine is built once per INFERENCE_IMGSZ (first load on a CUDA device)
+        and reused afterwards.
+        Falls back to the PyTorch weights when no GPU/TensorRT is available (e.g. RPi5 CPU).
+        """
+        # Keyed by input size: the engine has static shapes
+        engine_path = f"{os.path.splitext(model_path)[0]}_{self.INFERENCE_IMGSZ}.engine"
+        if os.path.exists(engine_path):
+            return engine_path
+        
+        try:
+            if not torch.cuda.is_available():
+                return model_path
+            
+            logger.info(f"Exporting {model_path} to TensorRT FP16 engine (one-time)")
+            exported = YOLO(model_path).export(format='engine', half=True, imgsz=self.INFERENCE_IMGSZ, device=0)
+            os.replace(exported, engine_path)
+            return engine_path
+        except Exception as e:
+            logger.warning(f"TensorRT export unavailable, using {model_path}: {e}")
+            return model_path
+    
+    def load_model(self, model_path='yolov8n.pt', async_inference=False):
+        """
+        Load YOLO model for traffic light detection
+        
+        Args:
+            model_path: YOLO weights path
+            async_inference: Run YOLO on a background thread so detect_gesture()
+                never blocks on inference (uses the latest available result).
+                detect_gesture() then no longer paces its caller - call it once
+                per new camera frame, as the gesture history is counted in calls
+        """
         try:
             if self.model is None:
+                model_path = self._resolve_model_path(model_path)
                 logger.info(f"Loading YOLO model for gesture detection: {model_path}")
                 self.model = YOLO(model_path)
             
             self.is_loaded = True
             logger.info("Gesture detection model loaded")
+            
+            # Warm-up: builds the predictor and allocates its buffers before the first real frame
+            self._infer(np.zeros((self.INFERENCE_IMGSZ, self.INFERENCE_IMGSZ, 3), dtype=np.uint8), self.INFERENCE_IMGSZ)
+            
+            if async_inference:
+                self._start_inference_worker()
             return True
         except Exception as e:
             logger.error(f"Failed to load gesture detection model: {e}")
             return False
     
+    def _start_inference_worker(self):
+        """Start the background YOLO worker (no-op if already running)"""
+        if self._inference_thread is not None and self._inference_thread.is_alive():
+            return
+        
+        self._inbox = queue.Queue(maxsize=1)
+        self._inference_thread = threading.Thread(target=self._inference_loop, daemon=True)
+        self._inference_thread.start()
+        logger.info("Gesture detection inference worker started")
+    
+    def _inference_loop(self):
+        """Run detection on the most recent submitted frame, forever"""
+        while True:
+            frame = self._inbox.get()
+            self._latest_detection = self._track_traffic_light(frame)
+    
+    def _submit_frame(self, frame):
+        """Hand a frame to the inference worker, replacing any stale one (never blocks)"""
+        try:
+            self._inbox.put_nowait(frame)
+        except queue.Full:
+            try:
+                self._inbox.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self._inbox.put_nowait(frame)
+            except queue.Full:
+                pass
+    
+    def _infer(self, source, imgsz):
+        """Run YOLO under torch.inference_mode (the model keeps reusing its predictor)"""
+        with torch.inference_mode():
+            return self.model(source, verbose=False, conf=0.4, imgsz=imgsz)
+    
     def _detect_traffic_light(self, frame):
         """
         Detect traffic light in frame
@@ -75,91 +215,131 @@ class PedestrianGestureDetector:
             return False, None, 0
         
         try:
-            results = self.model(frame, verbose=False, conf=0.4)
-            
-            if results and len(results) > 0:
-                result = results[0]
-                
-                # Class 9 is 'traffic light' in COCO dataset
-                for box in result.boxes:
-                    class_id = int(box.cls[0])
-                    confidence = float(box.conf[0])
-                    
-                    if class_id == 9:  # Traffic light
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        bbox = (x1, y1, x2, y2)
-                        return True, bbox, confidence
+            # Downscale once here (long side -> INFERENCE_IMGSZ), scale boxes back afterwards
+            small, scale = self._downscale(frame, self.INFERENCE_IMGSZ)
+            results = self._infer(small, self.INFERENCE_IMGSZ)
             
-            return False, None, 0
+            detected, bbox, confidence = self._parse_traffic_light(results[0])
+            if detected and scale != 1.0:
+                bbox = tuple(int(v / scale) for v in bbox)
+            return detected, bbox, confidence
             
         except Exception as e:
             logger.error(f"Error detecting traffic light: {e}")
             return False, None, 0
     
-    def _estimate_proximity(self, bbox, frame_shape):
+    def _downscale(self, frame, size):
         """
-        Estimate proximity based on traffic light size in frame
+        Resize frame so its long side is at most `size` (aspect ratio preserved)
         
-        Args:
-            bbox: Bounding box (x1, y1, x2, y2)
-            frame_shape: Frame shape (h, w, c)
-            
         Returns:
-            float: Normalized area (0-1)
+            Tuple of (resized_frame, scale) where scale = resized / original
         """
-        h, w = frame_shape[:2]
-        x1, y1, x2, y2 = bbox
+        h, w = frame.shape[:2]
+        scale = size / max(h, w)
+        if scale >= 1.0:
+            return frame, 1.0
         
-        bbox_width = x2 - x1
-        bbox_height = y2 - y1
-        bbox_area = bbox_width * bbox_height
+        resized = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        return resized, scale
+    
+    def _parse_traffic_light(self, result):
+        """Extract the most confident traffic light box from a single YOLO result"""
+        boxes = result.boxes
         
-        frame_area = h * w
-        normalized_area = bbox_area / frame_area
+        # Class 9 is 'traffic light' in COCO dataset - filter on the tensors directly
+        mask = boxes.cls == 9
+        if not mask.any():
+            return False, None, 0
         
-        return normalized_area
+        confs = boxes.conf[mask]
+        best = int(confs.argmax())
+        x1, y1, x2, y2 = boxes.xyxy[mask][best].cpu().numpy().astype(int).tolist()
+        return True, (x1, y1, x2, y2), float(confs[best])
     
-    def _check_center_alignment(self, bbox, frame_shape):
+    def _detect_in_roi(self, frame, bbox):
         """
-        Check if traffic light is reasonably centered in frame
+        Detect traffic light inside a padded crop around the previous bbox
         
         Args:
-            bbox: Bounding box (x1, y1, x2, y2)
-            frame_shape: Frame shape (h, w, c)
+            frame: Input frame (BGR)
+            bbox: Previous bounding box (x1, y1, x2, y2)
             
         Returns:
-            bool: True if centered
+            Tuple of (detected, bbox, confidence) in full-frame coordinates
         """
-        h, w = frame_shape[:2]
+        h, w = frame.shape[:2]
         x1, y1, x2, y2 = bbox
+        pad = int(max(x2 - x1, y2 - y1) * self.ROI_PADDING)
+        rx1, ry1 = max(0, x1 - pad), max(0, y1 - pad)
+        rx2, ry2 = min(w, x2 + pad), min(h, y2 + pad)
         
-        # Calculate center
-        center_x = (x1 + x2) / 2
-        center_y = (y1 + y2) / 2
+        if rx2 <= rx1 or ry2 <= ry1:
+            return False, None, 0
         
-        # Frame center
-        frame_center_x = w / 2
-        frame_center_y = h / 2
+        try:
+            results = self._infer(frame[ry1:ry2, rx1:rx2], self.ROI_IMGSZ)
+            detected, roi_bbox, confidence = self._parse_traffic_light(results[0])
+        except Exception as e:
+            logger.error(f"Error detecting traffic light in ROI: {e}")
+            return False, None, 0
         
-        # Check if within center region (40% of frame)
-        x_deviation = abs(center_x - frame_center_x) / w
-        y_deviation = abs(center_y - frame_center_y) / h
+        if not detected:
+            return False, None, 0
         
-        return x_deviation < 0.3 and y_deviation < 0.3
+        bx1, by1, bx2, by2 = roi_bbox
+        return True, (bx1 + rx1, by1 + ry1, bx2 + rx1, by2 + ry1), confidence
     
-    def detect_gesture(self, frame, draw_overlay=True):
+    def _track_traffic_light(self, frame):
+        """
+        Frame-skipping traffic light detection
+        
+        Reuses the last result between strides, searches a cropped ROI around
+        the last bbox while the light is tracked, and falls back to full-frame
+        detection periodically or when the track is lost.
+        
+        Returns:
+            Tuple of (detected, bbox, confidence) or (False, None, 0)
+        """
+        self._frame_idx += 1
+        last_detected, last_bbox, _ = self._last_detection
+        
+        if last_detected and self._frame_idx % self.DETECT_STRIDE != 0:
+            return self._last_detection
+        
+        result = (False, None, 0)
+        if last_detected and self._frame_idx % self.FULL_FRAME_INTERVAL != 0:
+            result = self._detect_in_roi(frame, last_bbox)
+        
+        if not result[0]:
+            result = self._detect_traffic_light(frame)
+        
+        self._last_detection = result
+        return result
+    
+    def _record_detection(self, value):
+        """Push a 0/1 detection result into the history ring buffer (O(1))"""
+        idx = self._hist_idx
+        self._hist_sum += value - int(self._hist[idx])
+        self._hist[idx] = value
+        self._hist_idx = (idx + 1) % self.HISTORY_SIZE
+        self._hist_count = min(self._hist_count + 1, self.HISTORY_SIZE)
+    
+    def detect_gesture(self, frame, draw_overlay=True, mutate_in_place=False):
         """
         Detect pedestrian crossing gesture
         
         Args:
             frame: Input frame from smartphone camera (BGR)
             draw_overlay: Whether to draw detection overlay
+            mutate_in_place: Draw the overlay directly on `frame` instead of a copy
+                (use when the caller owns the frame, e.g. DroidCam.get_frame())
             
         Returns:
             Tuple of (gesture_detected, confidence, annotated_frame, direction)
         """
-        current_time = time.time()
-        annotated_frame = frame.copy() if draw_overlay else frame
+        current_time = time.monotonic()
+        annotated_frame = frame.copy() if draw_overlay and not mutate_in_place else frame
         
         # Check cooldown
         if current_time - self.last_detection_time < self.COOLDOWN_PERIOD:
@@ -177,13 +357,19 @@ class PedestrianGestureDetector:
             return False, 0.0, annotated_frame, None
         
         # Layer 1: Detect traffic light
-        detected, bbox, confidence = self._detect_traffic_light(frame)
+        if self._inbox is not None:
+            # Async: submit this frame (a copy if we are about to draw on it) and use
+            # the latest finished result
+            self._submit_frame(frame.copy() if annotated_frame is frame and draw_overlay else frame)
+            detected, bbox, confidence = self._latest_detection
+        else:
+            detected, bbox, confidence = self._track_traffic_light(frame)
         
         if not detected:
             # Reset gesture if no detection
             self.gesture_start_time = None
             self.gesture_active = False
-            self.detection_history.append(0)
+            self._record_detection(0)
             
             if draw_overlay:
                 cv2.putText(
@@ -198,8 +384,12 @@ class PedestrianGestureDetector:
             
             return False, 0.0, annotated_frame, None
         
+        # Layers 2-3 geometry: proximity, orientation and quadrant in one call
+        h, w = frame.shape[:2]
+        x1, y1, x2, y2 = bbox
+        proximity, is_centered, quadrant = _analyze_bbox(x1, y1, x2, y2, h, w)
+        
         # Layer 2: Check proximity (distance estimation)
-        proximity = self._estimate_proximity(bbox, frame.shape)
         
         if proximity < self.PROXIMITY_THRESHOLD:
             if draw_overlay:
@@ -214,12 +404,10 @@ class PedestrianGestureDetector:
                 )
             
             self.gesture_start_time = None
-            self.detection_history.append(0)
+            self._record_detection(0)
             return False, 0.0, annotated_frame, None
         
         # Layer 3: Check center alignment (orientation)
-        is_centered = self._check_center_alignment(bbox, frame.shape)
-        
         if not is_centered:
             if draw_overlay:
                 cv2.putText(
@@ -233,7 +421,7 @@ class PedestrianGestureDetector:
                 )
             
             self.gesture_start_time = None
-            self.detection_history.append(0)
+            self._record_detection(0)
             return False, 0.0, annotated_frame, None
         
         # All conditions met - start/continue gesture tracking
@@ -241,42 +429,27 @@ class PedestrianGestureDetector:
             self.gesture_start_time = current_time
             self.gesture_active = True
         
-        self.detection_history.append(1)
+        self._record_detection(1)
         
         # Layer 4: Check persistence
         gesture_duration = current_time - self.gesture_start_time
         
         if draw_overlay:
             # Draw traffic light bbox
-            x1, y1, x2, y2 = bbox
             cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), (0, 255, 0), 3)
             
             # Draw progress bar
             progress = min(gesture_duration / self.PERSISTENCE_THRESHOLD, 1.0)
-            bar_width = 400
-            bar_height = 30
-            bar_x = 10
-            bar_y = 60
+            bar_x, bar_y, bar_width, bar_height = self.PROGRESS_BAR
             
-            # Background
-            cv2.rectangle(
-                annotated_frame,
-                (bar_x, bar_y),
-                (bar_x + bar_width, bar_y + bar_height),
-                (50, 50, 50),
-                -1
-            )
+            # Background + progress are solid fills: write the bar region directly
+            # (one slice per fill instead of a full cv2.rectangle pass each)
+            bar = annotated_frame[bar_y:bar_y + bar_height + 1, bar_x:bar_x + bar_width + 1]
+            bar[:] = (50, 50, 50)
             
-            # Progress
             fill_width = int(bar_width * progress)
             color = (0, 255, 0) if progress >= 1.0 else (0, 165, 255)
-            cv2.rectangle(
-                annotated_frame,
-                (bar_x, bar_y),
-                (bar_x + fill_width, bar_y + bar_height),
-                color,
-                -1
-            )
+            bar[:, :fill_width + 1] = color
             
             # Text
             status_text = "CROSSING REQUEST SENT!" if progress >= 1.0 else "Hold steady..."
@@ -331,62 +504,34 @@ class PedestrianGestureDetector:
             self.gesture_active = False
             self.last_detection_time = current_time
             
-            # Determine direction based on frame position (simple heuristic)
-            # In real implementation, this could use GPS or other location data
-            direction = self._estimate_direction(bbox, frame.shape)
+            # Determine direction based on frame quadrant (simple heuristic)
+            # In real implementation, this could use GPS, compass orientation or map matching
+            direction = QUADRANT_DIRECTIONS[quadrant]
             
             return True, confidence, annotated_frame, direction
         
         return False, confidence, annotated_frame, None
     
-    def _estimate_direction(self, bbox, frame_shape):
-        """
-        Estimate which direction the pedestrian wants to cross
-        
-        This is a simplified heuristic. In production, would use:
-        - GPS location
-        - Compass orientation
-        - Map matching
-        
-        Args:
-            bbox: Traffic light bounding box
-            frame_shape: Frame shape
-            
-        Returns:
-            str: Direction ('NORTH', 'EAST', 'SOUTH', 'WEST')
-        """
-        # Simple heuristic: based on where traffic light appears in frame
-        h, w = frame_shape[:2]
-        x1, y1, x2, y2 = bbox
-        
-        center_x = (x1 + x2) / 2
-        center_y = (y1 + y2) / 2
-        
-        # Divide frame into quadrants
-        if center_x < w / 2 and center_y < h / 2:
-            return 'NORTH'
-        elif center_x >= w / 2 and center_y < h / 2:
-            return 'EAST'
-        elif center_x >= w / 2 and center_y >= h / 2:
-            return 'SOUTH'
-        else:
-            return 'WEST'
-    
     def reset(self):
         """Reset gesture detection state"""
         self.gesture_start_time = None
         self.gesture_active = False
-        self.detection_history.clear()
+        self._hist[:] = 0
+        self._hist_idx = 0
+        self._hist_count = 0
+        self._hist_sum = 0
+        self._last_detection = (False, None, 0)
+        self._latest_detection = (False, None, 0)
     
     def get_status(self):
         """Get current gesture detection status"""
-        current_time = time.time()
+        current_time = time.monotonic()
         
         status = {
             'gesture_active': self.gesture_active,
             'gesture_duration': current_time - self.gesture_start_time if self.gesture_start_time else 0,
             'cooldown_remaining': max(0, self.COOLDOWN_PERIOD - (current_time - self.last_detection_time)),
-            'detection_rate': sum(self.detection_history) / len(self.detection_history) if self.detection_history else 0
+            'detection_rate': self._hist_sum / self._hist_count if self._hist_count else 0
         }
         
         return status
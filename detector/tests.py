@@ -1,3 +1,331 @@
-from django.test import TestCase
+import itertools
+import threading
+from unittest import mock
 
-# Create your tests here.
+import numpy as np
+from django.test import SimpleTestCase
+
+from detector.traffic_controller import TrafficController, _score_kernel, _green_time_kernel
+from detector.yolo_detector import VehicleTracker
+
+
+@mock.patch('detector.traffic_controller.log_to_database')
+class SchedulerTests(SimpleTestCase):
+    """Deferred callbacks share one scheduler thread instead of a Timer each"""
+
+    def setUp(self):
+        self.controller = TrafficController(mock.Mock())
+
+    def test_callbacks_run_in_deadline_order(self, _log):
+        order = []
+        done = threading.Event()
+
+        def first():
+            order.append('first')
+
+        def second():
+            order.append('second')
+            done.set()
+
+        self.controller._schedule(0.05, second)
+        self.controller._schedule(0.01, first)
+
+        self.assertTrue(done.wait(2.0))
+        self.assertEqual(order, ['first', 'second'])
+
+    def test_one_thread_serves_all_callbacks(self, _log):
+        self.controller._schedule(10, mock.Mock())
+        thread = self.controller._sched_thread
+        self.controller._schedule(10, mock.Mock())
+
+        self.assertIs(self.controller._sched_thread, thread)
+        self.assertEqual(thread.name, 'traffic-scheduler')
+
+    def test_pending_callback_is_not_queued_twice(self, _log):
+        callback = mock.Mock()
+
+        self.assertTrue(self.controller._schedule(10, callback))
+        self.assertFalse(self.controller._schedule(10, callback))
+        self.assertEqual(len(self.controller._sched), 1)
+
+
+@mock.patch('detector.traffic_controller.log_to_database')
+class VehicleCountTests(SimpleTestCase):
+    """update_vehicle_counts keeps the running total in step with the counts"""
+
+    def setUp(self):
+        self.controller = TrafficController(mock.Mock())
+        self.controller.set_mode('MANUAL')
+
+    def test_total_follows_partial_updates(self, _log):
+        tc = self.controller
+        tc.update_vehicle_counts({'NORTH': 3, 'EAST': 1})
+        tc.update_vehicle_counts({'EAST': 4})
+        tc.update_vehicle_counts({'NORTH': 0, 'WEST': 2})
+
+        self.assertEqual(tc._total, 6)
+        self.assertEqual(tc.get_counts().tolist(), [0, 4, 0, 2])
+
+    def test_concurrent_updates_keep_total_consistent(self, _log):
+        tc = self.controller
+
+        def report(direction):
+            for i in range(2000):
+                tc.update_vehicle_counts({direction: i % 7})
+
+        threads = [threading.Thread(target=report, args=(d,)) for d in ('NORTH', 'SOUTH')]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(tc._total, int(tc.vehicle_counts.sum()))
+
+
+def _old_priority_score(count, wait, cycles, speed, ped_requested, ped_wait, priority_multiplier,
+                        waiting_bonus, ped_min_wait, ped_max_wait):
+    """Per-direction scoring as calculate_direction_priority_score did it before the kernel"""
+    score = count * 10
+    score += (wait / 10) * waiting_bonus
+    score += cycles * 10
+    if speed > 0:
+        score += 5 * min(speed, 2)
+    score *= priority_multiplier
+    if ped_requested:
+        if ped_wait >= ped_max_wait:
+            score = 0
+        elif ped_wait < ped_min_wait:
+            score += 20
+    return score
+
+
+def _old_green_time(count, wait, speed, priority_multiplier, peak, night, fairness_cut,
+                    car_min_green, per_vehicle, waiting_bonus, extension, t_min, t_max):
+    """Green time as _calculate_green_time computed it before the kernel"""
+    base_time = car_min_green + (count * per_vehicle)
+    base_time += (wait / 10) * waiting_bonus
+    if speed > 0.5:
+        base_time += extension * min(speed, 2)
+    base_time *= priority_multiplier
+    if peak:
+        base_time *= 1.2
+    if night and count < 2:
+        base_time = max(t_min / 2, 5)
+    if fairness_cut:
+        base_time *= 0.7
+    return max(t_min, min(base_time, t_max))
+
+
+class NumericKernelTests(SimpleTestCase):
+    """The vectorized/JIT kernels must match the original scalar formulas"""
+
+    TC = TrafficController
+
+    def test_score_kernel_matches_old_formula(self):
+        rng = np.random.default_rng(0)
+        n = len(self.TC.DIRECTIONS)
+
+        for _ in range(200):
+            counts = rng.integers(0, 15, n).astype(np.int32)
+            car_wait = rng.uniform(0, 200, n)
+            cycles = rng.integers(0, 5, n).astype(np.int32)
+            speeds = rng.choice([-1.0, 0.0, 0.3, 1.5, 4.0], n)
+            ped_requested = rng.random(n) < 0.5
+            ped_wait = rng.choice([0.0, 10.0, 20.0, 60.0, 120.0, 300.0], n)
+            prio_mul = rng.choice([1.0, 1.5], n)
+
+            scores = _score_kernel(
+                counts, car_wait, cycles, speeds, ped_requested, ped_wait, prio_mul,
+                float(self.TC.T_CAR_WAITING_BONUS),
+                float(self.TC.T_PEDESTRIAN_MIN_WAIT), float(self.TC.T_PEDESTRIAN_MAX_WAIT)
+            )
+
+            for i in range(n):
+                expected = _old_priority_score(
+                    int(counts[i]), float(car_wait[i]), int(cycles[i]), float(speeds[i]),
+                    bool(ped_requested[i]), float(ped_wait[i]), float(prio_mul[i]),
+                    self.TC.T_CAR_WAITING_BONUS, self.TC.T_PEDESTRIAN_MIN_WAIT, self.TC.T_PEDESTRIAN_MAX_WAIT
+                )
+                self.assertAlmostEqual(scores[i], expected, places=6)
+
+    def test_green_time_kernel_matches_old_formula(self):
+        constants = (
+            float(self.TC.T_CAR_MIN_GREEN), float(self.TC.T_PER_VEHICLE), float(self.TC.T_CAR_WAITING_BONUS),
+            float(self.TC.T_CAR_EXTENSION), float(self.TC.T_MIN), float(self.TC.T_MAX)
+        )
+        grid = itertools.product(
+            [0, 1, 2, 5, 20],            # vehicle_count
+            [0.0, 15.0, 90.0],           # wait_time
+            [0.0, 0.5, 0.8, 3.0],        # speed
+            [1.0, 1.5],                  # priority_multiplier
+            [False, True],               # peak
+            [False, True],               # night
+            [False, True],               # fairness_cut
+        )
+
+        for count, wait, speed, prio, peak, night, cut in grid:
+            self.assertAlmostEqual(
+                _green_time_kernel(count, wait, speed, prio, peak, night, cut, *constants),
+                _old_green_time(count, wait, speed, prio, peak, night, cut, *constants),
+                places=6,
+                msg=f"count={count} wait={wait} speed={speed} prio={prio} peak={peak} night={night} cut={cut}"
+            )
+
+
+@mock.patch('detector.traffic_controller.log_to_database')
+class SimpleModeTests(SimpleTestCase):
+    """SIMPLE-mode state machine and cancellation of its scheduled steps"""
+
+    def setUp(self):
+        self.led = mock.Mock()
+        self.controller = TrafficController(self.led)
+
+    def _counts(self, total):
+        return {'NORTH': total, 'EAST': 0, 'SOUTH': 0, 'WEST': 0}
+
+    def _pending(self):
+        return [entry[2] for entry in self.controller._sched]
+
+    def test_emergency_stop_cancels_pending_steps(self, _log):
+        tc = self.controller
+        tc.update_vehicle_counts(self._counts(2))
+        self.assertIn(tc._set_simple_green, self._pending())
+
+        tc.emergency_stop()
+
+        self.assertEqual(tc.mode, 'MANUAL')
+        self.assertEqual(tc._simple_state, 'RED')
+        self.assertEqual(tc.current_state, 'RED')
+        self.assertNotIn(tc._set_simple_green, self._pending())
+        self.led.set_all_red.assert_called()
+
+        # A step that was already running when the stop came in must not turn the light green
+        tc._set_simple_green()
+        self.assertEqual(tc.current_state, 'RED')
+        self.assertEqual(tc._simple_state, 'RED')
+
+    def test_leaving_simple_mode_cancels_pending_steps(self, _log):
+        tc = self.controller
+        tc.update_vehicle_counts(self._counts(1))
+        tc._set_simple_green()
+        tc._last_detection_time -= tc.SIMPLE_GREEN_DURATION
+        tc.update_vehicle_counts(self._counts(0))
+        self.assertIn(tc._set_simple_red, self._pending())
+
+        tc.set_mode('AUTO')
+
+        self.assertEqual(tc._simple_state, 'RED')
+        self.assertNotIn(tc._set_simple_red, self._pending())
+
+    def test_vehicle_switches_red_to_green(self, _log):
+        tc = self.controller
+        tc.update_vehicle_counts(self._counts(2))
+
+        self.assertEqual(tc._simple_state, 'RED_YELLOW')
+        self.assertIn(tc._set_simple_green, self._pending())
+
+        tc._set_simple_green()
+        self.assertEqual(tc._simple_state, 'GREEN')
+        self.assertEqual(tc.current_state, 'GREEN')
+
+    def test_empty_road_switches_green_to_red_after_timeout(self, _log):
+        tc = self.controller
+        tc.update_vehicle_counts(self._counts(1))
+        tc._set_simple_green()
+
+        # Still within SIMPLE_GREEN_DURATION: stays GREEN
+        tc.update_vehicle_counts(self._counts(0))
+        self.assertEqual(tc._simple_state, 'GREEN')
+
+        tc._last_detection_time -= tc.SIMPLE_GREEN_DURATION
+        tc.update_vehicle_counts(self._counts(0))
+        self.assertEqual(tc._simple_state, 'YELLOW')
+        self.assertIn(tc._set_simple_red, self._pending())
+
+        tc._set_simple_red()
+        self.assertEqual(tc._simple_state, 'RED')
+
+    def test_vehicle_during_yellow_returns_to_green(self, _log):
+        tc = self.controller
+        tc.update_vehicle_counts(self._counts(1))
+        tc._set_simple_green()
+        tc._last_detection_time -= tc.SIMPLE_GREEN_DURATION
+        tc.update_vehicle_counts(self._counts(0))
+
+        tc.update_vehicle_counts(self._counts(3))
+        self.assertEqual(tc._simple_state, 'GREEN')
+
+        # The pending red step no longer applies
+        tc._set_simple_red()
+        self.assertEqual(tc._simple_state, 'GREEN')
+
+    def test_unchanged_green_skips_the_transition_lock(self, _log):
+        tc = self.controller
+        tc.update_vehicle_counts(self._counts(1))
+        tc._set_simple_green()
+        tc._transition_lock = mock.MagicMock()
+
+        tc.update_vehicle_counts(self._counts(4))
+
+        tc._transition_lock.__enter__.assert_not_called()
+        self.assertEqual(tc._simple_state, 'GREEN')
+
+
+def _detection(x, y):
+    """(centroid, bbox) tuple as produced by YOLODetector._parse_vehicles"""
+    return ((x, y), (int(x) - 5, int(y) - 5, int(x) + 5, int(y) + 5))
+
+
+class VehicleTrackerTests(SimpleTestCase):
+    """Centroid tracker: Hungarian assignment, distance gate, aging"""
+
+    def setUp(self):
+        self.tracker = VehicleTracker(max_disappeared=2)
+
+    def test_first_detections_are_registered(self):
+        tracked = self.tracker.update([_detection(10, 10), _detection(100, 100)])
+
+        self.assertEqual(sorted(tracked), [0, 1])
+        self.assertEqual(self.tracker.objects, {0: (10.0, 10.0), 1: (100.0, 100.0)})
+
+    def test_moved_objects_keep_their_ids(self):
+        self.tracker.update([_detection(10, 10), _detection(100, 100)])
+        tracked = self.tracker.update([_detection(105, 102), _detection(14, 12)])
+
+        self.assertEqual(tracked[0][0], (14, 12))
+        self.assertEqual(tracked[1][0], (105, 102))
+        self.assertEqual(self.tracker.next_id, 2)
+
+    def test_assignment_is_globally_optimal(self):
+        # Greedy nearest-first would pair B with (20, 0), leaving A 55px from
+        # (55, 0) - beyond the gate - and register a spurious new vehicle
+        self.tracker.update([_detection(0, 0), _detection(30, 0)])
+        tracked = self.tracker.update([_detection(20, 0), _detection(55, 0)])
+
+        self.assertEqual(tracked[0][0], (20, 0))
+        self.assertEqual(tracked[1][0], (55, 0))
+        self.assertEqual(self.tracker.next_id, 2)
+
+    def test_far_detection_is_a_new_vehicle(self):
+        self.tracker.update([_detection(0, 0)])
+        tracked = self.tracker.update([_detection(VehicleTracker.MAX_MATCH_DISTANCE + 1, 0)])
+
+        self.assertEqual(list(tracked), [1])
+        self.assertEqual(self.tracker.disappeared.tolist(), [1, 0])
+
+    def test_unmatched_objects_expire_after_max_disappeared(self):
+        self.tracker.update([_detection(0, 0)])
+
+        for _ in range(self.tracker.max_disappeared):
+            self.assertEqual(self.tracker.update([]), {})
+        self.assertEqual(self.tracker.object_ids.tolist(), [0])
+
+        self.tracker.update([])
+        self.assertEqual(self.tracker.object_ids.tolist(), [])
+
+    def test_rematch_resets_disappeared(self):
+        self.tracker.update([_detection(0, 0)])
+        self.tracker.update([])
+        self.tracker.update([_detection(3, 4)])
+
+        self.assertEqual(self.tracker.disappeared.tolist(), [0])
@@ -5,76 +5,310 @@ Supports both SIMPLE mode (immediate response) and AUTO mode (intelligent cyclin
 
 import threading
 import time
+import queue
+import heapq
+import itertools
 import logging
-from collections import deque
-from datetime import datetime, date, time as dt_time
+import numpy as np
+from collections import deque, namedtuple
+from datetime import datetime, date, timezone as dt_timezone
+
+from detector.jit import njit, NUMBA_AVAILABLE
 
 logger = logging.getLogger(__name__)
 
-# Track last vehicle count log time to avoid spam
-_last_vehicle_count_log = 0
 VEHICLE_COUNT_LOG_INTERVAL = 10  # Log every 10 seconds
 
+# Database writes are queued here and flushed in batches by a single writer thread,
+# so the detection/control loops never wait on SQLite commits
+LOG_QUEUE_SIZE = 4096
+LOG_BATCH_SIZE = 50  # Max records per bulk_create flush
+LOG_FLUSH_INTERVAL = 1.0  # Flush at least this often (seconds) when traffic is low
+_log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_log_writer = None
+_log_writer_lock = threading.Lock()
+_dropped_log_records = itertools.count(1)  # next() is atomic under the GIL
+
+# Django models, imported on first use: tuple once loaded, False if Django is unavailable
+_MODELS = None
+
+class RateLimiter:
+    """
+    Allow an action at most once per `period` seconds
+    
+    Holds a single deadline; checking and advancing it is one float compare
+    and store, safe enough under the GIL for logging rate limits.
+    """
+    
+    def __init__(self, period):
+        self._period = period
+        self._next = float('-inf')
+    
+    def ready(self, now):
+        """Check whether the action is allowed at `now` without consuming it"""
+        return now >= self._next
+    
+    def tick(self, now):
+        """Consume the action if allowed at `now` (monotonic seconds)"""
+        if now >= self._next:
+            self._next = now + self._period
+            return True
+        return False
+
+
+# Track last vehicle count log time to avoid spam
+_vehicle_count_log_limiter = RateLimiter(VEHICLE_COUNT_LOG_INTERVAL)
+
+# Immutable status published by the controller, read by get_status() without locking
+StatusSnapshot = namedtuple('StatusSnapshot', [
+    'mode', 'current_state', 'current_direction', 'current_direction_idx',
+    'vehicle_counts', 'total_vehicles', 'waiting_cycles', 'pedestrian_requests',
+    'statistics'
+])
+
+
+# ============ NUMERIC KERNELS (compiled with Numba when available) ============
+
+@njit(cache=True, fastmath=True)
+def _score_kernel(counts, car_wait, cycles, speeds, ped_requested, ped_wait, priority_multipliers,
+                  waiting_bonus, ped_min_wait, ped_max_wait):
+    """
+    Priority scores for all directions (see TrafficController.calculate_direction_priority_score)
+    
+    Args:
+        counts, cycles: int arrays; car_wait, speeds, ped_wait, priority_multipliers:
+        float arrays; ped_requested: bool array - all indexed like DIRECTIONS
+        
+    Returns:
+        np.ndarray: float score per direction
+    """
+    # Base score from vehicle count + wait time bonus + anti-starvation bonus
+    scores = counts * 10.0 + (car_wait / 10.0) * waiting_bonus + cycles * 10.0
+    
+    # Speed factor: if vehicles actively arriving, higher priority (capped at 10 bonus points)
+    scores = scores + 5.0 * np.minimum(np.maximum(speeds, 0.0), 2.0)
+    
+    # Priority lane multiplier (1.0 for all other directions)
+    scores = scores * priority_multipliers
+    
+    # Pedestrian adjustments (cars get priority over pedestrians):
+    # force crossing if waited too long (score 0), otherwise +20 while they
+    # haven't waited long enough to keep car priority high
+    forced = ped_requested & (ped_wait >= ped_max_wait)
+    early = ped_requested & (ped_wait < ped_min_wait)
+    scores = np.where(early, scores + 20.0, scores)
+    return np.where(forced, 0.0, scores)
+
+
+@njit(cache=True, fastmath=True)
+def _green_time_kernel(vehicle_count, wait_time, speed, priority_multiplier, peak, night,
+                       fairness_cut, car_min_green, per_vehicle, waiting_bonus, extension,
+                       t_min, t_max):
+    """
+    Green time for one direction (see TrafficController._calculate_green_time)
+    
+    Returns:
+        float: Green time in seconds, clamped to [t_min, t_max]
+    """
+    # T_green = T_CAR_MIN_GREEN + (vehicles * T_PER_VEHICLE) + wait bonus
+    base_time = car_min_green + vehicle_count * per_vehicle + (wait_time / 10.0) * waiting_bonus
+    
+    # Speed extension: if vehicles still arriving (>= 0.5/s), extend
+    if speed > 0.5:
+        base_time += extension * min(speed, 2.0)
+    
+    base_time *= priority_multiplier
+    
+    # Peak hour adjustment
+    if peak:
+        base_time *= 1.2
+    
+    # Night mode reduction
+    if night and vehicle_count < 2:
+        base_time = max(t_min / 2.0, 5.0)
+    
+    # Fairness cap: reduce to 70% if other directions are starving
+    if fairness_cut:
+        base_time *= 0.7
+    
+    return max(t_min, min(base_time, t_max))
+
 
 def log_to_database(event_type, message, direction=None, vehicle_count=0, led_state=None, triggered_by='AUTO', direction_counts=None):
     """
     Log events to Django database
     Safe to call even when Django isn't fully loaded
     
+    Never blocks: records are queued for the background writer thread. If the
+    queue is full the record is dropped (a warning is logged every 100 drops).
+    
     Args:
         event_type: Type of event (CAR, PEDESTRIAN, LED_CHANGE, SYSTEM, EMERGENCY)
         message: Event description
         direction: Direction (NORTH, EAST, SOUTH, WEST)
-        vehicle_count: Total vehicle count
+        vehicle_count: Total vehicle count (also added to daily stats with direction_counts)
         led_state: LED state if changed
         triggered_by: What triggered the event
         direction_counts: Dict with counts per direction {'NORTH': 5, 'EAST': 3, ...}
     """
-    try:
-        from detection.models import DetectionEvent, TrafficLightState, VehicleCount, SystemStats
-        
-        # Log detection event
-        DetectionEvent.objects.create(
-            event_type=event_type,
-            direction=direction,
-            message=message,
-            vehicle_count=vehicle_count
-        )
+    # Running without Django (e.g. standalone scripts) - nothing to log to
+    if _MODELS is False:
+        return
+    
+    if _log_writer is None:
+        _start_log_writer()
+    
+    timestamp = datetime.now(dt_timezone.utc)
+    records = [('event', {
+        'timestamp': timestamp,
+        'event_type': event_type,
+        'direction': direction,
+        'message': message,
+        'vehicle_count': vehicle_count
+    })]
+    
+    # Log LED state change if applicable
+    if led_state:
+        records.append(('light', {
+            'timestamp': timestamp,
+            'state': led_state,
+            'direction': direction,
+            'triggered_by': triggered_by
+        }))
+    
+    # Log vehicle counts periodically (not every call)
+    if direction_counts and _vehicle_count_log_limiter.tick(time.monotonic()):
+        records.append(('count', {
+            'timestamp': timestamp,
+            'north_count': direction_counts.get('NORTH', 0),
+            'east_count': direction_counts.get('EAST', 0),
+            'south_count': direction_counts.get('SOUTH', 0),
+            'west_count': direction_counts.get('WEST', 0)
+        }))
+        records.append(('stats', {
+            'date': date.today(),
+            'vehicles': vehicle_count,
+            'pedestrian_requests': 1 if event_type == 'PEDESTRIAN' else 0,
+            'light_cycles': 1 if led_state else 0
+        }))
+    
+    for record in records:
+        try:
+            _log_queue.put_nowait(record)
+        except queue.Full:
+            dropped = next(_dropped_log_records)
+            if dropped % 100 == 1:
+                logger.warning(f"Database log queue full - {dropped} records dropped so far")
+
+
+def _get_models():
+    """
+    Import the detection models once and cache them
+    
+    Returns:
+        tuple: (DetectionEvent, TrafficLightState, VehicleCount, SystemStats),
+        False if Django isn't installed, or None if apps aren't loaded yet (retried)
+    """
+    global _MODELS
+    if _MODELS is None:
+        try:
+            from detection.models import DetectionEvent, TrafficLightState, VehicleCount, SystemStats
+            _MODELS = (DetectionEvent, TrafficLightState, VehicleCount, SystemStats)
+        except ImportError as e:
+            logger.debug(f"Database logging disabled: {e}")
+            _MODELS = False
+        except Exception as e:
+            logger.debug(f"Could not log to database: {e}")
+    return _MODELS
+
+
+def _start_log_writer():
+    """Start the database writer thread (once)"""
+    global _log_writer
+    with _log_writer_lock:
+        if _log_writer is None:
+            _log_writer = threading.Thread(target=_log_writer_loop, name='db-log-writer', daemon=True)
+            _log_writer.start()
+
+
+def _log_writer_loop():
+    """
+    Drain _log_queue and write records in batches
+    
+    Waits up to LOG_FLUSH_INTERVAL for the first record, then takes whatever
+    else is already queued (up to LOG_BATCH_SIZE) and flushes it in one
+    transaction.
+    """
+    if _get_models() is False:
+        return
+    
+    _configure_sqlite()
+    
+    while True:
+        try:
+            batch = [_log_queue.get(timeout=LOG_FLUSH_INTERVAL)]
+        except queue.Empty:
+            continue
         
-        # Log LED state change if applicable
-        if led_state:
-            TrafficLightState.objects.create(
-                state=led_state,
-                direction=direction,
-                triggered_by=triggered_by
-            )
+        while len(batch) < LOG_BATCH_SIZE:
+            try:
+                batch.append(_log_queue.get_nowait())
+            except queue.Empty:
+                break
         
-        # Log vehicle counts periodically (not every call)
-        global _last_vehicle_count_log
-        current_time = time.time()
-        if direction_counts and (current_time - _last_vehicle_count_log) >= VEHICLE_COUNT_LOG_INTERVAL:
-            _last_vehicle_count_log = current_time
-            total = sum(direction_counts.values())
-            VehicleCount.objects.create(
-                north_count=direction_counts.get('NORTH', 0),
-                east_count=direction_counts.get('EAST', 0),
-                south_count=direction_counts.get('SOUTH', 0),
-                west_count=direction_counts.get('WEST', 0),
-                total_count=total
-            )
-            
-            # Update daily stats
-            today = date.today()
-            stats, created = SystemStats.objects.get_or_create(date=today)
-            stats.total_vehicles_detected += total
-            if event_type == 'PEDESTRIAN':
-                stats.total_pedestrian_requests += 1
-            if led_state:
-                stats.total_light_cycles += 1
-            stats.save()
-            
+        try:
+            if _get_models():
+                _flush_log_batch(batch)
+        except Exception as e:
+            logger.debug(f"Could not log to database: {e}")
+
+
+def _configure_sqlite():
+    """Enable WAL journaling on the writer's SQLite connection"""
+    try:
+        from django.db import connection
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode=WAL;')
+                cursor.execute('PRAGMA synchronous=NORMAL;')
     except Exception as e:
-        logger.debug(f"Could not log to database: {e}")
+        logger.debug(f"Could not configure SQLite: {e}")
+
+
+def _flush_log_batch(batch):
+    """Write one batch of queued records using bulk_create"""
+    from django.db import transaction
+    from django.db.models import F
+    DetectionEvent, TrafficLightState, VehicleCount, SystemStats = _MODELS
+    
+    events = [DetectionEvent(**fields) for kind, fields in batch if kind == 'event']
+    lights = [TrafficLightState(**fields) for kind, fields in batch if kind == 'light']
+    counts = [VehicleCount(**fields) for kind, fields in batch if kind == 'count']
+    stats = [fields for kind, fields in batch if kind == 'stats']
+    
+    with transaction.atomic():
+        if events:
+            DetectionEvent.objects.bulk_create(events)
+        if lights:
+            TrafficLightState.objects.bulk_create(lights)
+        if counts:
+            VehicleCount.objects.bulk_create(counts)
+        
+        # Update daily stats with one UPDATE ... SET x = x + n per day,
+        # creating the row only when it doesn't exist yet
+        for update in stats:
+            updated = SystemStats.objects.filter(date=update['date']).update(
+                total_vehicles_detected=F('total_vehicles_detected') + update['vehicles'],
+                total_pedestrian_requests=F('total_pedestrian_requests') + update['pedestrian_requests'],
+                total_light_cycles=F('total_light_cycles') + update['light_cycles']
+            )
+            if not updated:
+                SystemStats.objects.create(
+                    date=update['date'],
+                    total_vehicles_detected=update['vehicles'],
+                    total_pedestrian_requests=update['pedestrian_requests'],
+                    total_light_cycles=update['light_cycles']
+                )
 
 
 class TrafficController:
@@ -141,6 +375,47 @@ class TrafficController:
     # Directions
     DIRECTIONS = ['NORTH', 'EAST', 'SOUTH', 'WEST']
     
+    # Settings accepted by update_algorithm_settings():
+    # (section, key, attribute, cast, min, max)
+    _SETTING_SPECS = (
+        ('timing', 'T_MIN', 'T_MIN', int, 5, 30),
+        ('timing', 'T_MAX', 'T_MAX', int, 30, 120),
+        ('timing', 'T_PER_VEHICLE', 'T_PER_VEHICLE', int, 1, 10),
+        ('pedestrian', 'T_PEDESTRIAN', 'T_PEDESTRIAN', int, 5, 30),
+        ('pedestrian', 'T_PEDESTRIAN_COOLDOWN', 'T_PEDESTRIAN_COOLDOWN', int, 10, 120),
+        ('pedestrian', 'T_PEDESTRIAN_MIN_WAIT', 'T_PEDESTRIAN_MIN_WAIT', int, 5, 60),
+        ('pedestrian', 'T_PEDESTRIAN_MAX_WAIT', 'T_PEDESTRIAN_MAX_WAIT', int, 30, 300),
+        ('car_priority', 'T_CAR_MIN_GREEN', 'T_CAR_MIN_GREEN', int, 5, 30),
+        ('car_priority', 'T_CAR_EXTENSION', 'T_CAR_EXTENSION', int, 1, 15),
+        ('car_priority', 'T_CAR_WAITING_BONUS', 'T_CAR_WAITING_BONUS', int, 0, 10),
+        ('priority_lane', 'multiplier', 'PRIORITY_LANE_MULTIPLIER', float, 1.0, 3.0),
+        ('priority_lane', 'min_vehicles', 'PRIORITY_LANE_MIN_VEHICLES', int, 1, 10),
+        ('balancing', 'max_wait_cycles', 'MAX_WAIT_CYCLES', int, 1, 10),
+    )
+    # (section, key, attribute)
+    _SETTING_FLAGS = (
+        ('priority_lane', 'enabled', 'PRIORITY_LANE_ENABLED'),
+        ('balancing', 'enabled', 'BALANCE_ENABLED'),
+    )
+    
+    # Per-direction pedestrian record (see TrafficController._pedestrians)
+    PEDESTRIAN_DTYPE = np.dtype([
+        ('count', np.int32),
+        ('waiting_start', np.float64),
+        ('waiting_time', np.float64),
+        ('requested', np.bool_),
+        ('last_served', np.float64),
+    ])
+    
+    # Peak / night windows as local seconds of day ([start, end))
+    _PEAK_MORNING = (7 * 3600, 9 * 3600)
+    _PEAK_EVENING = (17 * 3600, 19 * 3600)
+    _NIGHT_START = 22 * 3600
+    _NIGHT_END = 6 * 3600
+    
+    # Number of recent events kept for get_event_log()
+    EVENT_LOG_SIZE = 1000
+    
     def __init__(self, led_controller):
         """
         Initialize traffic controller
@@ -160,8 +435,13 @@ class TrafficController:
         self.mode = 'SIMPLE'  # SIMPLE, AUTO, or MANUAL (default to SIMPLE for immediate response)
         self.running = False
         
-        # Vehicle counts per direction
-        self.vehicle_counts = {direction: 0 for direction in self.DIRECTIONS}
+        n = len(self.DIRECTIONS)  # Size of every per-direction array below
+        
+        # Vehicle counts per direction (indexed like DIRECTIONS)
+        self.vehicle_counts = np.zeros(n, dtype=np.int32)
+        self._total = 0  # Sum of vehicle_counts, recomputed with each update
+        self._counts_lock = threading.Lock()  # Guards vehicle_counts writes + _total
+        self._last_counts = (0,) * n  # Last counts seen by update_vehicle_counts
         self.previous_counts = {direction: 0 for direction in self.DIRECTIONS}  # Track changes
         
         # Simple mode state
@@ -169,30 +449,60 @@ class TrafficController:
         self._simple_state = 'RED'
         self._transition_lock = threading.Lock()
         
-        # ============ INTELLIGENT TIMING TRACKING ============
+        # Deferred callbacks (SIMPLE-mode transitions, emergency end) run on one
+        # long-lived scheduler thread instead of a threading.Timer each
+        self._sched = []  # heap of (deadline, seq, callback)
+        self._sched_seq = itertools.count()
+        self._sched_lock = threading.Lock()
+        self._sched_wake = threading.Event()
+        self._sched_thread = None
+        
+        # LED writes are queued in order and performed by one writer thread,
+        # so detection/control threads never block on strip I/O
+        self._led_queue = deque()  # (method name, args)
+        self._led_lock = threading.Lock()  # Held while a write is performed
+        self._led_wake = threading.Event()
+        self._led_thread = None
         
-        # Waiting time tracking (in seconds)
-        self.car_waiting_time = {direction: 0 for direction in self.DIRECTIONS}
-        self.car_waiting_start = {direction: 0 for direction in self.DIRECTIONS}
-        self.waiting_cycles = {direction: 0 for direction in self.DIRECTIONS}
+        # ============ INTELLIGENT TIMING TRACKING ============
         
-        # Pedestrian queue tracking
-        self.pedestrian_count = {direction: 0 for direction in self.DIRECTIONS}
-        self.pedestrian_waiting_start = {direction: 0 for direction in self.DIRECTIONS}
-        self.pedestrian_waiting_time = {direction: 0 for direction in self.DIRECTIONS}
+        # Per-direction state is kept as NumPy arrays indexed like DIRECTIONS
+        # (struct-of-arrays), so scoring runs over all directions at once
+        self._dir_idx = {direction: idx for idx, direction in enumerate(self.DIRECTIONS)}  # name -> index
+        self._direction_names = np.array(self.DIRECTIONS)  # For direction masks
+        self._direction_indices = np.arange(n)
+        self._prio_mul = np.ones(n, dtype=np.float64)  # See _rebuild_prio_mul()
+        
+        # Waiting time tracking (in seconds, 0 = not waiting)
+        self.car_waiting_time = np.zeros(n, dtype=np.float64)
+        self.car_waiting_start = np.zeros(n, dtype=np.float64)
+        self.waiting_cycles = np.zeros(n, dtype=np.int32)
+        
+        # Pedestrian state: one record per direction in a single contiguous array;
+        # the pedestrian_* attributes are field views into it
+        self._pedestrians = np.zeros(n, dtype=self.PEDESTRIAN_DTYPE)
+        self._pedestrians['last_served'] = float('-inf')
+        self.pedestrian_count = self._pedestrians['count']
+        self.pedestrian_waiting_start = self._pedestrians['waiting_start']
+        self.pedestrian_waiting_time = self._pedestrians['waiting_time']
+        self.pedestrian_requests = self._pedestrians['requested']
+        self.pedestrian_last_served = self._pedestrians['last_served']
+        self._ped_mask = 0  # Bit i set <=> pedestrian_requests[i]; one int test for "any request"
+        self._max_ped_wait = 0.0  # Longest current pedestrian wait (set by update_waiting_times)
+        self._max_ped_wait_idx = 0
         
         # Speed estimation (vehicles per second entering zone)
-        self.vehicle_speed_estimate = {direction: 0 for direction in self.DIRECTIONS}
-        self.vehicle_history = {direction: deque(maxlen=self.FRAMES_FOR_SPEED) for direction in self.DIRECTIONS}
+        self.vehicle_speed_estimate = np.zeros(n, dtype=np.float64)
+        # Ring buffer of the last FRAMES_FOR_SPEED (time, count) samples per direction
+        self._hist_time = np.zeros((n, self.FRAMES_FOR_SPEED), dtype=np.float64)
+        self._hist_count = np.zeros((n, self.FRAMES_FOR_SPEED), dtype=np.int32)
+        self._hist_idx = np.zeros(n, dtype=np.int32)  # Next write slot
+        self._hist_len = np.zeros(n, dtype=np.int32)  # Valid samples (<= FRAMES_FOR_SPEED)
         
         # Priority lane tracking
         self.priority_lane_triggered = False
         self.last_priority_time = 0
         
-        # Pedestrian requests
-        self.pedestrian_requests = {direction: False for direction in self.DIRECTIONS}
-        self.pedestrian_last_served = {direction: 0 for direction in self.DIRECTIONS}
-        
         # Statistics
         self.stats = {
             'total_vehicles_processed': 0,
@@ -204,13 +514,42 @@ class TrafficController:
             'priority_lane_activations': 0
         }
         
-        # Event log
-        self.event_log = deque(maxlen=1000)
+        # Event log: fixed ring of (timestamp, type, message) tuples
+        self.event_log = [None] * self.EVENT_LOG_SIZE
+        self._event_seq = itertools.count()  # Slot allocator
+        self._event_count = 0  # Events written so far (only ever grows)
+        self._event_lock = threading.Lock()  # Guards slot allocation + _event_count (never held for I/O)
+        self._ts_cache = (-1, '')  # (epoch second, formatted) - events often share a second
         
         # Control thread
         self.control_thread = None
         self.lock = threading.Lock()
         
+        # Wakes the control loop early (pedestrian request, mode change, stop)
+        self._control_event = threading.Event()
+        
+        # Cached (wall-clock minute, is_peak_hour, is_night_mode)
+        self._time_cache = (-1, False, False)
+        self._utc_offset = time.localtime().tm_gmtoff  # Seconds east of UTC
+        
+        # Latest published StatusSnapshot
+        self._snapshot = None
+        self._status_dirty = True  # Set by writers, snapshot rebuilt on next read
+        
+        # Compile (or load from cache) the Numba kernels now rather than on the
+        # first AUTO cycle
+        if NUMBA_AVAILABLE:
+            self._warm_up_kernels()
+        
+    def _warm_up_kernels(self):
+        """Call each numeric kernel once with the argument types used at runtime"""
+        try:
+            self._score_all()
+            _green_time_kernel(0, 0.0, 0.0, 1.0, False, False, False,
+                               1.0, 1.0, 1.0, 1.0, float(self.T_MIN), float(self.T_MAX))
+        except Exception as e:
+            logger.warning(f"⚠️ Numba kernel warm-up failed: {e}")
+    
     def start(self):
         """Start automatic traffic control"""
         if self.running:
@@ -227,11 +566,12 @@ class TrafficController:
     def stop(self):
         """Stop traffic control"""
         self.running = False
+        self._control_event.set()
         if self.control_thread:
             self.control_thread.join(timeout=5)
         
         # Set all to red
-        self.led_controller.set_all_red()
+        self._led_now('set_all_red')
         
         self._log_event("SYSTEM", "Traffic controller stopped")
         logger.info("Traffic controller stopped")
@@ -244,7 +584,13 @@ class TrafficController:
             direction: Direction of emergency vehicle
         """
         if not self.EMERGENCY_PRIORITY:
-            logger.debug(f"Emergency priority disabled - ignoring detection in {direction}")
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(f"Emergency priority disabled - ignoring detection in {direction}")
+            return
+        
+        # Already handling an emergency - skip the lock on every following frame
+        # (an unlocked read is fine, the check is repeated under the lock)
+        if self.emergency_active:
             return
         
         # Use try-finally to prevent blocking
@@ -264,13 +610,13 @@ class TrafficController:
                     
                     # Immediate transition to green for emergency
                     if self.led_controller:
-                        self.led_controller.set_state('GREEN')
+                        self._led('set_state', 'GREEN')
                     self.current_state = 'GREEN'
+                    self._publish_status()
+                    self._control_event.set()
                     
                     # Schedule return to normal after emergency green time (non-blocking)
-                    timer = threading.Timer(self.EMERGENCY_GREEN_TIME, self._end_emergency)
-                    timer.daemon = True  # Don't block program exit
-                    timer.start()
+                    self._schedule(self.EMERGENCY_GREEN_TIME, self._end_emergency)
         except Exception as e:
             logger.error(f"Emergency handler error: {e}")
             self.emergency_active = False
@@ -282,6 +628,7 @@ class TrafficController:
             self.emergency_direction = None
             logger.info("🚨 Emergency priority ended - returning to normal operation")
             self._log_event("EMERGENCY", "Emergency priority ended")
+            self._publish_status()
     
     def calculate_green_time(self, vehicle_count):
         """
@@ -299,7 +646,8 @@ class TrafficController:
         green_time = self.T_MIN + (vehicle_count * self.T_PER_VEHICLE)
         green_time = max(self.T_MIN, min(green_time, self.T_MAX))
         
-        logger.debug(f"Calculated green time: {green_time}s for {vehicle_count} vehicles")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Calculated green time: {green_time}s for {vehicle_count} vehicles")
         return green_time
     
     def update_vehicle_counts(self, counts_dict, emergency_info=None):
@@ -317,40 +665,99 @@ class TrafficController:
             self.handle_emergency(emergency_info.get('direction'))
             return  # Emergency takes over, skip normal processing
         
-        with self.lock:
-            # Store previous counts for comparison
-            old_total = sum(self.vehicle_counts.values())
-            
-            for direction in self.DIRECTIONS:
+        # Fast path: same counts as last frame and nothing time-based pending
+        last = self._last_counts
+        counts_key = tuple(counts_dict.get(direction, last[idx]) for idx, direction in enumerate(self.DIRECTIONS))
+        if counts_key == last and self._counts_settled():
+            if self._total > 0:
+                self._last_detection_time = time.monotonic()
+            return
+        
+        # Several /video_feed streams may report counts at once: the slot writes
+        # and the total are done together under _counts_lock (never held for I/O)
+        counts = self.vehicle_counts  # Bound once - called at detection frame rate
+        edges = []  # (direction, new_count) for directions that flipped 0 -> N or N -> 0
+        
+        with self._counts_lock:
+            for idx, direction in enumerate(self.DIRECTIONS):
                 if direction in counts_dict:
-                    old_count = self.vehicle_counts[direction]
                     new_count = counts_dict[direction]
-                    self.vehicle_counts[direction] = new_count
-                    
-                    # Log significant changes to database
-                    if new_count != old_count:
-                        if new_count > old_count:
-                            log_to_database('CAR', f"Vehicle detected in {direction}", direction, new_count, triggered_by='DETECTION')
-                        # Don't log vehicle leaving for less spam
-            
-            new_total = sum(self.vehicle_counts.values())
+                    if (counts[idx] == 0) != (new_count == 0):
+                        edges.append((direction, new_count))
+                    counts[idx] = new_count
             
-            # Log vehicle counts to database periodically
+            old_total = self._total
+            new_total = int(counts.sum())
+            self._total = new_total
+            self._last_counts = tuple(counts.tolist())
+        
+        # Log only occupancy edges (a direction becoming occupied or clear) -
+        # count jitter while vehicles are queued would otherwise write an event every frame
+        for direction, new_count in edges:
+            if new_count > 0:
+                log_to_database('CAR', f"Vehicle detected in {direction}", direction, new_count, triggered_by='DETECTION')
+            else:
+                log_to_database('CAR', f"{direction} clear - no vehicles", direction, 0, triggered_by='DETECTION')
+        
+        self._rebuild_prio_mul()
+        
+        # Log vehicle counts to database periodically (message only built when due)
+        if _vehicle_count_log_limiter.ready(time.monotonic()):
+            north, east, south, west = counts.tolist()
             log_to_database(
                 'CAR', 
-                f"Vehicle count update: N={self.vehicle_counts['NORTH']} E={self.vehicle_counts['EAST']} S={self.vehicle_counts['SOUTH']} W={self.vehicle_counts['WEST']}", 
+                f"Vehicle count update: N={north} E={east} S={south} W={west}", 
                 direction=None, 
                 vehicle_count=new_total,
-                direction_counts=self.vehicle_counts.copy()
+                direction_counts=self._as_direction_dict(counts)
             )
         
-        # Skip normal processing if emergency is active
-        if self.emergency_active:
-            return
-        
         # SIMPLE mode: Immediate LED response based on detection
-        if self.mode == 'SIMPLE':
+        # (skip normal processing if emergency is active)
+        if not self.emergency_active and self.mode == 'SIMPLE':
             self._handle_simple_mode_detection(old_total, new_total)
+        
+        self._publish_status()
+    
+    def _counts_settled(self):
+        """
+        Check whether an unchanged count update can be skipped
+        
+        False while a periodic vehicle-count log is due, or while SIMPLE mode
+        still has to act on the current total (e.g. GREEN with no vehicles
+        waiting for the SIMPLE_GREEN_DURATION timeout).
+        """
+        if _vehicle_count_log_limiter.ready(time.monotonic()):
+            return False
+        if self.mode != 'SIMPLE' or self.emergency_active:
+            return True
+        if self._total > 0:
+            return self._simple_state in ('GREEN', 'RED_YELLOW')
+        return self._simple_state in ('RED', 'YELLOW')
+    
+    def should_run_detection(self):
+        """
+        Check whether the next camera frame needs vehicle detection
+        
+        In SIMPLE mode a GREEN light that saw vehicles less than half of
+        SIMPLE_GREEN_DURATION ago cannot change on the next frame, so callers
+        may skip YOLO inference and keep the previous counts.
+        
+        Returns:
+            bool: False if detection can be skipped for this frame
+        """
+        if self.mode != 'SIMPLE' or self._simple_state != 'GREEN':
+            return True
+        return time.monotonic() - self._last_detection_time >= self.SIMPLE_GREEN_DURATION * 0.5
+    
+    def get_counts(self):
+        """
+        Get a copy of the current vehicle counts (lock-free)
+        
+        Returns:
+            np.ndarray: Vehicle count per direction, indexed like DIRECTIONS
+        """
+        return self.vehicle_counts.copy()
     
     def _handle_simple_mode_detection(self, old_total, new_total):
         """
@@ -361,69 +768,189 @@ class TrafficController:
         - No vehicles (total = 0): Show RED
         - Transitions through YELLOW for safety
         """
+        # Fast path without the lock: the light already shows (or is on its way
+        # to) what the current total asks for. A scheduled step racing with
+        # this unlocked read is picked up on the next frame
+        state = self._simple_state
+        if new_total > 0:
+            if state == 'GREEN' or state == 'RED_YELLOW':
+                self._last_detection_time = time.monotonic()
+                return
+        elif state != 'GREEN':
+            return
+        
         with self._transition_lock:
-            current_time = time.time()
+            current_time = time.monotonic()
+            state = self._simple_state  # Re-read under the lock
             
             if new_total > 0:
                 # Vehicles detected - should be GREEN
-                if self._simple_state != 'GREEN':
+                if state != 'GREEN':
                     # Transition to green
-                    if self._simple_state == 'RED':
+                    if state == 'RED':
                         # RED -> RED_YELLOW -> GREEN
                         logger.info(f"🚗 Vehicle detected ({new_total} total) - switching to GREEN")
-                        self.led_controller.set_state('RED_YELLOW')
+                        self._led('set_state', 'RED_YELLOW')
                         self._simple_state = 'RED_YELLOW'
                         self.current_state = 'RED_YELLOW'
                         
                         # Short delay then green
-                        threading.Timer(1.0, self._set_simple_green).start()
+                        self._schedule(1.0, self._set_simple_green)
+                        log_to_database('LED_CHANGE', f"RED_YELLOW - {new_total} vehicles", None, new_total, 'RED_YELLOW', 'DETECTION')
                         
-                    elif self._simple_state == 'YELLOW':
+                    elif state == 'YELLOW':
                         # If transitioning to red, cancel and go back to green
                         logger.info(f"🚗 Vehicle still detected - staying GREEN")
-                        self.led_controller.set_state('GREEN')
+                        self._led('set_state', 'GREEN')
                         self._simple_state = 'GREEN'
                         self.current_state = 'GREEN'
+                        log_to_database('LED_CHANGE', f"GREEN - {new_total} vehicles", None, new_total, 'GREEN', 'DETECTION')
                         
                 self._last_detection_time = current_time
-                log_to_database('LED_CHANGE', f"GREEN - {new_total} vehicles", None, new_total, 'GREEN', 'DETECTION')
                     
             else:
                 # No vehicles - should be RED (after timeout)
-                if self._simple_state == 'GREEN':
+                if state == 'GREEN':
                     # Only go to yellow if enough time has passed since last detection
                     time_since_detection = current_time - self._last_detection_time
                     if time_since_detection >= self.SIMPLE_GREEN_DURATION:
                         logger.info("🚫 No vehicles detected - switching to RED")
-                        self.led_controller.set_state('YELLOW')
+                        self._led('set_state', 'YELLOW')
                         self._simple_state = 'YELLOW'
                         self.current_state = 'YELLOW'
                         
                         # After yellow, go to red
-                        threading.Timer(self.SIMPLE_YELLOW_DURATION, self._set_simple_red).start()
+                        self._schedule(self.SIMPLE_YELLOW_DURATION, self._set_simple_red)
                         log_to_database('LED_CHANGE', 'YELLOW - transitioning to RED', None, 0, 'YELLOW', 'AUTO')
     
     def _set_simple_green(self):
         """Set LED to GREEN in simple mode (called after transition)"""
         with self._transition_lock:
-            if self._simple_state == 'RED_YELLOW':
-                self.led_controller.set_state('GREEN')
+            # A mode change / emergency stop may have overtaken this step
+            if self.mode == 'SIMPLE' and self._simple_state == 'RED_YELLOW':
+                self._led('set_state', 'GREEN')
                 self._simple_state = 'GREEN'
                 self.current_state = 'GREEN'
                 logger.info("✅ LED set to GREEN")
+                self._publish_status()
                 log_to_database('LED_CHANGE', 'GREEN - vehicles allowed', None, 0, 'GREEN', 'DETECTION')
     
     def _set_simple_red(self):
         """Set LED to RED in simple mode (called after yellow transition)"""
         with self._transition_lock:
             # Only set red if still in yellow state (vehicle might have appeared)
-            if self._simple_state == 'YELLOW':
-                self.led_controller.set_state('RED')
+            if self.mode == 'SIMPLE' and self._simple_state == 'YELLOW':
+                self._led('set_state', 'RED')
                 self._simple_state = 'RED'
                 self.current_state = 'RED'
                 logger.info("🛑 LED set to RED")
+                self._publish_status()
                 log_to_database('LED_CHANGE', 'RED - stop', None, 0, 'RED', 'AUTO')
     
+    def _schedule(self, delay, callback):
+        """
+        Run `callback` on the scheduler thread after `delay` seconds
+        
+        A callback that is already pending is not queued twice.
+        
+        Returns:
+            bool: True if scheduled, False if already pending
+        """
+        with self._sched_lock:
+            if any(entry[2] == callback for entry in self._sched):
+                return False
+            heapq.heappush(self._sched, (time.monotonic() + delay, next(self._sched_seq), callback))
+            
+            if self._sched_thread is None:
+                self._sched_thread = threading.Thread(target=self._scheduler_loop, name='traffic-scheduler', daemon=True)
+                self._sched_thread.start()
+        
+        self._sched_wake.set()
+        return True
+    
+    def _cancel(self, *callbacks):
+        """Drop pending scheduler entries for the given callbacks"""
+        with self._sched_lock:
+            remaining = [entry for entry in self._sched if entry[2] not in callbacks]
+            if len(remaining) != len(self._sched):
+                heapq.heapify(remaining)
+                self._sched = remaining
+    
+    def _cancel_simple_transitions(self):
+        """Cancel pending SIMPLE-mode steps and reset its state machine to RED"""
+        self._cancel(self._set_simple_green, self._set_simple_red)
+        self._simple_state = 'RED'
+    
+    def _scheduler_loop(self):
+        """Run scheduled callbacks as their deadlines pass"""
+        while True:
+            callback = None
+            timeout = None
+            with self._sched_lock:
+                if self._sched:
+                    deadline = self._sched[0][0]
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        callback = heapq.heappop(self._sched)[2]
+            
+            if callback is not None:
+                try:
+                    callback()
+                except Exception as e:
+                    logger.error(f"Scheduled callback error: {e}", exc_info=True)
+                continue
+            
+            # Sleep until the earliest deadline, or until something new is scheduled
+            self._sched_wake.wait(timeout=timeout)
+            self._sched_wake.clear()
+    
+    def _led(self, method, *args):
+        """
+        Queue an LED controller call for the writer thread
+        
+        Calls are performed in the order they were queued.
+        
+        Args:
+            method: LED controller method name (e.g. 'set_state')
+            *args: Arguments for the call
+        """
+        self._led_queue.append((method, args))
+        
+        if self._led_thread is None:
+            with self._led_lock:
+                if self._led_thread is None:
+                    self._led_thread = threading.Thread(target=self._led_writer_loop, name='led-writer', daemon=True)
+                    self._led_thread.start()
+        
+        self._led_wake.set()
+    
+    def _led_now(self, method, *args):
+        """
+        Drop all queued LED writes and perform `method` synchronously
+        
+        Used for all-red on stop/emergency stop: no earlier write can land after it.
+        """
+        with self._led_lock:
+            self._led_queue.clear()
+            getattr(self.led_controller, method)(*args)
+    
+    def _led_writer_loop(self):
+        """Perform queued LED writes"""
+        while True:
+            self._led_wake.wait()
+            self._led_wake.clear()
+            
+            while True:
+                with self._led_lock:
+                    try:
+                        method, args = self._led_queue.popleft()
+                    except IndexError:
+                        break
+                    try:
+                        getattr(self.led_controller, method)(*args)
+                    except Exception as e:
+                        logger.error(f"LED write error ({method}{args}): {e}")
+    
     def request_pedestrian_crossing(self, direction):
         """
         Request pedestrian crossing for a direction
@@ -437,8 +964,8 @@ class TrafficController:
         if direction not in self.DIRECTIONS:
             return False
         
-        current_time = time.time()
-        last_served = self.pedestrian_last_served[direction]
+        current_time = time.monotonic()
+        last_served = self.pedestrian_last_served[self._dir_idx[direction]]
         
         # Check cooldown
         if current_time - last_served < self.T_PEDESTRIAN_COOLDOWN:
@@ -447,12 +974,22 @@ class TrafficController:
             return False
         
         with self.lock:
-            self.pedestrian_requests[direction] = True
+            self._set_pedestrian_request(self._dir_idx[direction], True)
+        self._publish_status()
+        self._control_event.set()
         
         self._log_event("PEDESTRIAN", f"Crossing requested for {direction}")
         logger.info(f"Pedestrian crossing requested: {direction}")
         return True
     
+    def _set_pedestrian_request(self, direction_idx, requested):
+        """Set or clear a pedestrian request, keeping _ped_mask in sync (call under self.lock)"""
+        self.pedestrian_requests[direction_idx] = requested
+        if requested:
+            self._ped_mask |= 1 << direction_idx
+        else:
+            self._ped_mask &= ~(1 << direction_idx)
+    
     def set_mode(self, mode):
         """
         Set control mode
@@ -468,14 +1005,21 @@ class TrafficController:
             logger.warning(f"Invalid mode: {mode}")
             return False
         
-        with self.lock:
-            old_mode = self.mode
-            self.mode = mode
-            
-            # Initialize simple mode state when switching to SIMPLE
-            if mode == 'SIMPLE' and old_mode != 'SIMPLE':
-                self._simple_state = 'RED'
-                self.led_controller.set_state('RED')
+        # Under _transition_lock so a scheduled SIMPLE step can't land after the switch
+        with self._transition_lock:
+            with self.lock:
+                old_mode = self.mode
+                self.mode = mode
+                
+                if old_mode == 'SIMPLE' and mode != 'SIMPLE':
+                    self._cancel_simple_transitions()
+                
+                # Initialize simple mode state when switching to SIMPLE
+                if mode == 'SIMPLE' and old_mode != 'SIMPLE':
+                    self._simple_state = 'RED'
+                    self._led('set_state', 'RED')
+        self._publish_status()
+        self._control_event.set()
         
         self._log_event("SYSTEM", f"Mode changed to {mode}")
         logger.info(f"Control mode set to: {mode}")
@@ -497,66 +1041,87 @@ class TrafficController:
         if isinstance(direction, str):
             if direction not in self.DIRECTIONS:
                 return False
-            direction_idx = self.DIRECTIONS.index(direction)
+            direction_idx = self._dir_idx[direction]
         else:
             direction_idx = direction
         
-        self.led_controller.set_direction_state(direction_idx, state)
+        self._led('set_direction_state', direction_idx, state)
         self._log_event("MANUAL", f"{self.DIRECTIONS[direction_idx]} set to {state}")
         return True
     
-    def _is_peak_hour(self):
-        """Check if current time is peak hour"""
-        current_time = datetime.now().time()
+    def _time_flags(self):
+        """
+        Get (is_peak_hour, is_night_mode), recomputed once per wall-clock minute
+        
+        The answer can only change on an hour boundary, so it is cached under
+        the current minute number and the control loop and status API just
+        compare one integer on most calls.
+        """
+        minute = int(time.time() // 60)
+        cached_minute, peak, night = self._time_cache
+        if minute == cached_minute:
+            return peak, night
         
-        # Morning peak: 7:00 - 9:00
-        morning_peak = dt_time(7, 0) <= current_time <= dt_time(9, 0)
+        # Local UTC offset, re-read once per hour so DST changes are picked up
+        if minute // 60 != cached_minute // 60:
+            self._utc_offset = time.localtime().tm_gmtoff
         
-        # Evening peak: 17:00 - 19:00
-        evening_peak = dt_time(17, 0) <= current_time <= dt_time(19, 0)
+        # Local second of day, plain integer compares
+        sec = (minute * 60 + self._utc_offset) % 86400
         
-        return morning_peak or evening_peak
+        # Morning peak: 7:00 - 9:00, Evening peak: 17:00 - 19:00
+        peak = self._PEAK_MORNING[0] <= sec < self._PEAK_MORNING[1] or self._PEAK_EVENING[0] <= sec < self._PEAK_EVENING[1]
+        
+        # Night: 22:00 - 6:00
+        night = sec >= self._NIGHT_START or sec < self._NIGHT_END
+        
+        self._time_cache = (minute, peak, night)
+        return peak, night
+    
+    def _is_peak_hour(self):
+        """Check if current time is peak hour"""
+        return self._time_flags()[0]
     
     def _is_night_mode(self):
         """Check if current time is night (low traffic expected)"""
-        current_time = datetime.now().time()
-        
-        # Night: 22:00 - 6:00
-        return current_time >= dt_time(22, 0) or current_time <= dt_time(6, 0)
+        return self._time_flags()[1]
     
     def update_waiting_times(self):
         """
         Update waiting times for all directions
         Called periodically to track how long cars/pedestrians have been waiting
         """
-        current_time = time.time()
-        
-        for direction in self.DIRECTIONS:
-            # Update car waiting time (if they're waiting at red)
-            if self.vehicle_counts[direction] > 0:
-                if self.car_waiting_start[direction] == 0:
-                    # Start tracking wait time
-                    self.car_waiting_start[direction] = current_time
-                else:
-                    # Update accumulated wait time
-                    self.car_waiting_time[direction] = current_time - self.car_waiting_start[direction]
-            
-            # Update pedestrian waiting time
-            if self.pedestrian_requests[direction]:
-                if self.pedestrian_waiting_start[direction] == 0:
-                    self.pedestrian_waiting_start[direction] = current_time
-                else:
-                    self.pedestrian_waiting_time[direction] = current_time - self.pedestrian_waiting_start[direction]
+        current_time = time.monotonic()
+        
+        # Car waiting time (if they're waiting at red): start tracking, or update accumulated wait
+        self._update_wait(self.vehicle_counts > 0, self.car_waiting_start, self.car_waiting_time, current_time)
+        
+        # Pedestrian waiting time, plus the longest wait among pending requests
+        if self._ped_mask:
+            self._update_wait(self.pedestrian_requests, self.pedestrian_waiting_start, self.pedestrian_waiting_time, current_time)
+            waits = np.where(self.pedestrian_requests, self.pedestrian_waiting_time, -1.0)
+            self._max_ped_wait_idx = int(waits.argmax())
+            self._max_ped_wait = float(waits[self._max_ped_wait_idx])
+        else:
+            self._max_ped_wait = 0.0
+    
+    @staticmethod
+    def _update_wait(waiting, start, elapsed, now):
+        """Start (start == 0) or advance (start > 0) wait timers for the `waiting` mask in place"""
+        tracking = waiting & (start != 0)
+        elapsed[tracking] = now - start[tracking]
+        start[waiting & ~tracking] = now
     
     def reset_waiting_time(self, direction):
         """Reset waiting time for a direction after it gets green"""
-        self.car_waiting_time[direction] = 0
-        self.car_waiting_start[direction] = 0
-        self.waiting_cycles[direction] = 0
-        
-        if self.pedestrian_requests[direction]:
-            self.pedestrian_waiting_time[direction] = 0
-            self.pedestrian_waiting_start[direction] = 0
+        idx = self._dir_idx[direction]
+        self.car_waiting_time[idx] = 0
+        self.car_waiting_start[idx] = 0
+        self.waiting_cycles[idx] = 0
+        
+        if self.pedestrian_requests[idx]:
+            self.pedestrian_waiting_time[idx] = 0
+            self.pedestrian_waiting_start[idx] = 0
     
     def estimate_vehicle_speed(self, direction):
         """
@@ -569,27 +1134,34 @@ class TrafficController:
         if not self.SPEED_ESTIMATION_ENABLED:
             return 0
         
-        history = self.vehicle_history[direction]
-        if len(history) < 2:
+        idx = self._dir_idx[direction]
+        length = self._hist_len[idx]
+        if length < 2:
             return 0
         
-        # Calculate rate of change
-        first = history[0]
-        last = history[-1]
+        # Calculate rate of change between oldest and newest sample
+        size = self.FRAMES_FOR_SPEED
+        first = (self._hist_idx[idx] - length) % size
+        last = (self._hist_idx[idx] - 1) % size
+        first_count = self._hist_count[idx, first]
+        last_count = self._hist_count[idx, last]
         
-        if last['count'] > first['count']:
-            time_diff = last['time'] - first['time']
+        if last_count > first_count:
+            time_diff = self._hist_time[idx, last] - self._hist_time[idx, first]
             if time_diff > 0:
-                return (last['count'] - first['count']) / time_diff
+                return float((last_count - first_count) / time_diff)
         
         return 0
     
     def update_vehicle_history(self, direction, count):
         """Add vehicle count to history for speed estimation"""
-        self.vehicle_history[direction].append({
-            'time': time.time(),
-            'count': count
-        })
+        idx = self._dir_idx[direction]
+        slot = self._hist_idx[idx]
+        self._hist_time[idx, slot] = time.monotonic()
+        self._hist_count[idx, slot] = count
+        self._hist_idx[idx] = (slot + 1) % self.FRAMES_FOR_SPEED
+        if self._hist_len[idx] < self.FRAMES_FOR_SPEED:
+            self._hist_len[idx] += 1
     
     def calculate_direction_priority_score(self, direction):
         """
@@ -606,46 +1178,35 @@ class TrafficController:
         Returns:
             float: Priority score (higher = more urgent)
         """
-        vehicle_count = self.vehicle_counts[direction]
-        wait_time = self.car_waiting_time[direction]
-        cycles_waiting = self.waiting_cycles[direction]
-        speed = self.vehicle_speed_estimate[direction]
-        
-        # Base score from vehicle count
-        score = vehicle_count * 10
-        
-        # Wait time bonus (cars that have been waiting longer get priority)
-        wait_bonus = (wait_time / 10) * self.T_CAR_WAITING_BONUS
-        score += wait_bonus
-        
-        # Anti-starvation: cycles waiting bonus
-        starvation_bonus = cycles_waiting * 10
-        score += starvation_bonus
-        
-        # Speed factor: if vehicles actively arriving, higher priority
-        if speed > 0:
-            score += 5 * min(speed, 2)  # Cap at 10 bonus points
-        
-        # Priority lane multiplier
-        if self.PRIORITY_LANE_ENABLED and direction == self.PRIORITY_LANE_DIRECTION:
-            if vehicle_count >= self.PRIORITY_LANE_MIN_VEHICLES:
-                score *= self.PRIORITY_LANE_MULTIPLIER
-                logger.debug(f"Priority lane {direction} activated (multiplier: {self.PRIORITY_LANE_MULTIPLIER})")
+        return float(self._score_all()[self._dir_idx[direction]])
+    
+    def _score_all(self):
+        """
+        Vectorized priority scores for all directions (see calculate_direction_priority_score)
         
-        # Pedestrian penalty (cars get priority over pedestrians)
-        if self.pedestrian_requests.get(direction, False):
-            pedestrian_wait = self.pedestrian_waiting_time.get(direction, 0)
-            
-            # Only give pedestrians priority if they've waited too long
-            if pedestrian_wait >= self.T_PEDESTRIAN_MAX_WAIT:
-                # Force pedestrian crossing if waited too long
-                score = 0  # Reset car priority
-                logger.info(f"Pedestrian in {direction} exceeded max wait ({pedestrian_wait:.0f}s) - forcing crossing")
-            elif pedestrian_wait < self.T_PEDESTRIAN_MIN_WAIT:
-                # Pedestrians haven't waited long enough, penalize
-                score += 20  # Keep car priority high
+        Returns:
+            np.ndarray: Priority score per direction, indexed like DIRECTIONS
+        """
+        return _score_kernel(
+            self.vehicle_counts, self.car_waiting_time, self.waiting_cycles,
+            self.vehicle_speed_estimate, self.pedestrian_requests, self.pedestrian_waiting_time,
+            self._prio_mul, float(self.T_CAR_WAITING_BONUS),
+            float(self.T_PEDESTRIAN_MIN_WAIT), float(self.T_PEDESTRIAN_MAX_WAIT)
+        )
+    
+    def _rebuild_prio_mul(self):
+        """
+        Recompute the per-direction priority-lane score multipliers
         
-        return score
+        Called when vehicle counts or priority lane settings change, so
+        scoring is a plain vector multiply.
+        """
+        is_priority = (
+            (self._direction_names == self.PRIORITY_LANE_DIRECTION)
+            & (self.vehicle_counts >= self.PRIORITY_LANE_MIN_VEHICLES)
+            & self.PRIORITY_LANE_ENABLED
+        )
+        self._prio_mul = np.where(is_priority, float(self.PRIORITY_LANE_MULTIPLIER), 1.0)
     
     def _calculate_green_time(self, direction_idx):
         """
@@ -666,56 +1227,44 @@ class TrafficController:
             float: Green time in seconds
         """
         direction = self.DIRECTIONS[direction_idx]
-        vehicle_count = self.vehicle_counts[direction]
-        wait_time = self.car_waiting_time[direction]
-        speed = self.estimate_vehicle_speed(direction)
-        
-        # Base green time calculation
-        # T_green = T_MIN + (vehicles * T_PER_VEHICLE)
-        base_time = self.T_CAR_MIN_GREEN + (vehicle_count * self.T_PER_VEHICLE)
-        
-        # Wait time bonus: +2s per 10 seconds cars were waiting
-        wait_bonus = (wait_time / 10) * self.T_CAR_WAITING_BONUS
-        base_time += wait_bonus
+        vehicle_count = int(self.vehicle_counts[direction_idx])
+        wait_time = float(self.car_waiting_time[direction_idx])
+        speed = float(self.estimate_vehicle_speed(direction))
+        peak, night = self._time_flags()
         
-        # Speed extension: if vehicles still arriving, extend
-        if speed > 0.5:  # At least 0.5 vehicles per second arriving
-            extension = self.T_CAR_EXTENSION * min(speed, 2)
-            base_time += extension
-            logger.debug(f"{direction}: Extending green by {extension:.1f}s (vehicles arriving)")
+        if speed > 0.5 and logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{direction}: Extending green by {self.T_CAR_EXTENSION * min(speed, 2):.1f}s (vehicles arriving)")
         
         # Priority lane bonus
+        priority_multiplier = 1.0
         if self.PRIORITY_LANE_ENABLED and direction == self.PRIORITY_LANE_DIRECTION:
-            base_time *= self.PRIORITY_LANE_MULTIPLIER
-            self.stats['priority_lane_activations'] += 1
-        
-        # Peak hour adjustment
-        if self._is_peak_hour():
-            base_time *= 1.2
-        
-        # Night mode reduction
-        if self._is_night_mode() and vehicle_count < 2:
-            base_time = max(self.T_MIN / 2, 5)
+            priority_multiplier = float(self.PRIORITY_LANE_MULTIPLIER)
+            self._count_stat('priority_lane_activations')
         
         # Fairness cap: Check if other directions are starving
+        fairness_cut = False
         if self.BALANCE_ENABLED:
-            max_other_wait = 0
-            for other_dir in self.DIRECTIONS:
-                if other_dir != direction:
-                    max_other_wait = max(max_other_wait, self.waiting_cycles[other_dir])
+            max_other_wait = self._max_cycles_excluding(direction_idx)
             
             # If another direction has been waiting too long, reduce our time
             if max_other_wait >= self.MAX_WAIT_CYCLES:
-                reduction = 0.7  # Reduce to 70%
-                base_time *= reduction
+                fairness_cut = True
                 logger.info(f"{direction}: Reducing green time (fairness - others waiting {max_other_wait} cycles)")
         
-        # Clamp to min/max
-        green_time = max(self.T_MIN, min(base_time, self.T_MAX))
+        green_time = _green_time_kernel(
+            vehicle_count, wait_time, speed, priority_multiplier, peak, night, fairness_cut,
+            float(self.T_CAR_MIN_GREEN), float(self.T_PER_VEHICLE), float(self.T_CAR_WAITING_BONUS),
+            float(self.T_CAR_EXTENSION), float(self.T_MIN), float(self.T_MAX)
+        )
         
-        logger.debug(f"{direction}: Green time = {green_time:.1f}s (vehicles={vehicle_count}, wait={wait_time:.0f}s)")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"{direction}: Green time = {green_time:.1f}s (vehicles={vehicle_count}, wait={wait_time:.0f}s)")
         return green_time
     
+    def _max_cycles_excluding(self, direction_idx):
+        """Largest waiting_cycles value among the other directions (cycles are >= 0)"""
+        return int((self.waiting_cycles * (self._direction_indices != direction_idx)).max())
+    
     def _select_next_direction(self):
         """
         Select next direction for green light using intelligent priority scoring
@@ -733,48 +1282,37 @@ class TrafficController:
         # Update waiting times
         self.update_waiting_times()
         
-        # Check for forced pedestrian crossing (waited too long)
-        for idx, direction in enumerate(self.DIRECTIONS):
-            if self.pedestrian_requests[direction]:
-                wait_time = self.pedestrian_waiting_time[direction]
-                if wait_time >= self.T_PEDESTRIAN_MAX_WAIT:
-                    logger.info(f"FORCED: Pedestrian {direction} waited {wait_time:.0f}s (max: {self.T_PEDESTRIAN_MAX_WAIT}s)")
-                    return idx
+        # Check for forced pedestrian crossing (longest waiting pedestrian waited too long)
+        if self._max_ped_wait >= self.T_PEDESTRIAN_MAX_WAIT:
+            idx = self._max_ped_wait_idx
+            logger.info(f"FORCED: Pedestrian {self.DIRECTIONS[idx]} waited {self._max_ped_wait:.0f}s (max: {self.T_PEDESTRIAN_MAX_WAIT}s)")
+            return idx
         
         # Calculate priority score for each direction
-        scores = []
+        scores = self._score_all()
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Priority scores: {dict(zip(self.DIRECTIONS, scores.round(1).tolist()))}")
         
-        for idx, direction in enumerate(self.DIRECTIONS):
-            score = self.calculate_direction_priority_score(direction)
-            scores.append((score, idx, direction))
-            logger.debug(f"{direction}: Priority score = {score:.1f}")
-        
-        # Sort by score (descending)
-        scores.sort(reverse=True, key=lambda x: x[0])
-        
-        # Select highest priority
-        selected_score, selected_idx, selected_dir = scores[0]
-        
-        # Check if selection has any vehicles or pedestrians
-        if self.vehicle_counts[selected_dir] == 0 and not self.pedestrian_requests[selected_dir]:
-            # Try next best option
-            for score, idx, direction in scores[1:]:
-                if self.vehicle_counts[direction] > 0 or self.pedestrian_requests[direction]:
-                    selected_idx = idx
-                    selected_dir = direction
-                    selected_score = score
-                    break
+        # Select highest priority (first index wins ties)
+        selected_idx = int(scores.argmax())
+        
+        # Prefer the best direction that actually has vehicles or pedestrians
+        active = (self.vehicle_counts > 0) | self.pedestrian_requests
+        if not active[selected_idx] and active.any():
+            selected_idx = int(np.where(active, scores, -np.inf).argmax())
+        
+        selected_dir = self.DIRECTIONS[selected_idx]
+        selected_score = scores[selected_idx]
         
         # Update waiting cycles for non-selected directions
-        for idx, direction in enumerate(self.DIRECTIONS):
-            if idx != selected_idx:
-                if self.vehicle_counts[direction] > 0:
-                    self.waiting_cycles[direction] += 1
+        waiting = self.vehicle_counts > 0
+        waiting[selected_idx] = False
+        self.waiting_cycles[waiting] += 1
         
         # Reset waiting for selected direction
         self.reset_waiting_time(selected_dir)
         
-        logger.info(f"Selected {selected_dir} (score: {selected_score:.1f}, vehicles: {self.vehicle_counts[selected_dir]})")
+        logger.info(f"Selected {selected_dir} (score: {selected_score:.1f}, vehicles: {self.vehicle_counts[selected_idx]})")
         return selected_idx
     
     def handle_pedestrian_request_intelligent(self, direction):
@@ -793,13 +1331,13 @@ class TrafficController:
         if direction not in self.DIRECTIONS:
             return {'success': False, 'message': 'Invalid direction'}
         
-        current_time = time.time()
-        last_served = self.pedestrian_last_served.get(direction, 0)
+        current_time = time.monotonic()
+        last_served = self.pedestrian_last_served[self._dir_idx[direction]]
         
         # Check cooldown
         if current_time - last_served < self.T_PEDESTRIAN_COOLDOWN:
             remaining = int(self.T_PEDESTRIAN_COOLDOWN - (current_time - last_served))
-            self.stats['pedestrian_requests_denied'] += 1
+            self._count_stat('pedestrian_requests_denied')
             return {
                 'success': False,
                 'message': f'Cooldown active ({remaining}s remaining)',
@@ -808,14 +1346,17 @@ class TrafficController:
         
         # Register the request
         with self.lock:
-            self.pedestrian_requests[direction] = True
-            self.pedestrian_count[direction] = self.pedestrian_count.get(direction, 0) + 1
+            idx = self._dir_idx[direction]
+            self._set_pedestrian_request(idx, True)
+            self.pedestrian_count[idx] += 1
             
-            if self.pedestrian_waiting_start[direction] == 0:
-                self.pedestrian_waiting_start[direction] = current_time
+            if self.pedestrian_waiting_start[idx] == 0:
+                self.pedestrian_waiting_start[idx] = current_time
+        self._publish_status()
+        self._control_event.set()
         
         # Calculate estimated wait time
-        car_count = sum(self.vehicle_counts.values())
+        car_count = self._total
         
         if car_count > 0:
             estimated_wait = max(self.T_PEDESTRIAN_MIN_WAIT, car_count * 3)
@@ -833,34 +1374,104 @@ class TrafficController:
             'cars_ahead': car_count
         }
     
+    def _phase_aborted(self):
+        """Check whether AUTO-mode phase sequencing must stop (stop, mode change or emergency)"""
+        return not self.running or self.mode != 'AUTO' or self.emergency_active
+    
+    def _wait_phase(self, duration):
+        """
+        Hold the current light phase for `duration` seconds, preemptably
+        
+        Wakes on _control_event and aborts early on stop, mode change or emergency.
+        
+        Returns:
+            bool: True if the full duration elapsed, False if preempted
+        """
+        deadline = time.monotonic() + duration
+        while True:
+            if self._phase_aborted():
+                return False
+            
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            
+            self._control_event.wait(timeout=remaining)
+            self._control_event.clear()
+    
+    def _hold_green(self, green_time):
+        """
+        Hold the current green for `green_time` seconds
+        
+        Two event-driven phases: the first T_MIN seconds only end early on
+        stop / mode change; after that a pending pedestrian request also ends
+        the green. Pedestrian requests set _control_event, so the interrupt is
+        seen as soon as it is registered.
+        
+        Args:
+            green_time: Green duration in seconds
+        """
+        start_time = time.monotonic()
+        
+        # Phase 1: allow current direction to finish minimum time
+        min_end = start_time + min(self.T_MIN, green_time)
+        while self.running and self.mode == 'AUTO':
+            remaining = min_end - time.monotonic()
+            if remaining <= 0:
+                break
+            self._control_event.wait(timeout=remaining)
+            self._control_event.clear()
+        
+        # Phase 2: rest of the green, interruptible by pedestrians
+        end = start_time + green_time
+        while self.running and self.mode == 'AUTO':
+            if self._ped_mask:
+                logger.info("Interrupting for pedestrian request")
+                return
+            
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return
+            self._control_event.wait(timeout=remaining)
+            self._control_event.clear()
+    
     def _execute_transition(self, from_direction, to_direction):
         """
         Execute traffic light transition between directions
         
+        Each step is (direction index, state, hold seconds); holds are preemptable
+        so stop / mode change / emergency take effect immediately.
+        
         Args:
             from_direction: Current green direction index
             to_direction: Next green direction index
+            
+        Returns:
+            bool: True if the transition completed, False if it was preempted
         """
-        # Step 1: Current green → Yellow
-        logger.info(f"Transitioning: {self.DIRECTIONS[from_direction]} GREEN → YELLOW")
-        self.led_controller.set_direction_state(from_direction, 'YELLOW')
-        time.sleep(self.T_YELLOW)
-        
-        # Step 2: Current yellow → Red
-        logger.info(f"{self.DIRECTIONS[from_direction]} YELLOW → RED")
-        self.led_controller.set_direction_state(from_direction, 'RED')
-        time.sleep(0.5)  # Brief all-red for safety
-        
-        # Step 3: Next red → Red+Yellow
-        logger.info(f"{self.DIRECTIONS[to_direction]} RED → RED+YELLOW")
-        self.led_controller.set_direction_state(to_direction, 'RED_YELLOW')
-        time.sleep(self.T_RED_YELLOW)
-        
-        # Step 4: Next red+yellow → Green
-        logger.info(f"{self.DIRECTIONS[to_direction]} RED+YELLOW → GREEN")
-        self.led_controller.set_direction_state(to_direction, 'GREEN')
+        steps = [
+            (from_direction, 'YELLOW', self.T_YELLOW),  # Current green → Yellow
+            (from_direction, 'RED', 0.5),  # Current yellow → Red (brief all-red for safety)
+            (to_direction, 'RED_YELLOW', self.T_RED_YELLOW),  # Next red → Red+Yellow
+            (to_direction, 'GREEN', 0),  # Next red+yellow → Green
+        ]
+        
+        for direction_idx, state, hold in steps:
+            # Check-and-queue under _transition_lock so emergency_stop's all-red
+            # (which drops queued writes) can never be overwritten by this step
+            with self._transition_lock:
+                if self._phase_aborted():
+                    logger.info(f"Transition {self.DIRECTIONS[from_direction]} → {self.DIRECTIONS[to_direction]} preempted")
+                    return False
+                logger.info(f"Transitioning: {self.DIRECTIONS[direction_idx]} → {state}")
+                self._led('set_direction_state', direction_idx, state)
+            
+            if hold and not self._wait_phase(hold):
+                logger.info(f"Transition {self.DIRECTIONS[from_direction]} → {self.DIRECTIONS[to_direction]} preempted")
+                return False
         
         self._log_event("TRANSITION", f"{self.DIRECTIONS[from_direction]} → {self.DIRECTIONS[to_direction]}")
+        return True
     
     def _serve_pedestrian(self, direction_idx):
         """
@@ -874,15 +1485,16 @@ class TrafficController:
         logger.info(f"Serving pedestrian crossing for {direction}")
         self._log_event("PEDESTRIAN", f"Crossing started for {direction}")
         
-        # Green for pedestrians
-        time.sleep(self.T_PEDESTRIAN)
+        # Green for pedestrians (request stays pending if preempted)
+        if not self._wait_phase(self.T_PEDESTRIAN):
+            return
         
         # Update tracking
         with self.lock:
-            self.pedestrian_requests[direction] = False
-            self.pedestrian_last_served[direction] = time.time()
+            self._set_pedestrian_request(direction_idx, False)
+            self.pedestrian_last_served[direction_idx] = time.monotonic()
         
-        self.stats['pedestrian_requests_served'] += 1
+        self._count_stat('pedestrian_requests_served')
         self._log_event("PEDESTRIAN", f"Crossing completed for {direction}")
     
     def _control_loop(self):
@@ -890,21 +1502,27 @@ class TrafficController:
         logger.info("Control loop started")
         
         # Initialize: All red
-        self.led_controller.set_state('RED')
+        self._led('set_state', 'RED')
         self._simple_state = 'RED'
         self.current_state = 'RED'
+        self._publish_status()
         logger.info("All LEDs set to RED initially")
-        time.sleep(1)
+        self._control_event.wait(timeout=1)
+        self._control_event.clear()
         
         while self.running:
-            # In SIMPLE mode, LED control is handled directly by update_vehicle_counts
+            # In SIMPLE mode, LED control is handled directly by update_vehicle_counts;
+            # in MANUAL mode by the API. Idle until set_mode()/stop() wakes us
+            # (the timeout is only a safety net)
             if self.mode == 'SIMPLE':
-                time.sleep(0.1)  # Just keep the thread alive
+                self._control_event.wait(timeout=1.0)
+                self._control_event.clear()
                 continue
                 
             if self.mode == 'MANUAL':
                 logger.debug("Mode is MANUAL, waiting...")
-                time.sleep(1)
+                self._control_event.wait(timeout=1.0)
+                self._control_event.clear()
                 continue
             
             # AUTO mode: Intelligent cycling
@@ -912,50 +1530,40 @@ class TrafficController:
                 # Start with first direction green
                 if self.current_state == 'RED':
                     self.current_direction = 0
-                    self.led_controller.set_state('GREEN')
+                    self._led('set_state', 'GREEN')
                     self.current_state = 'GREEN'
+                    self._publish_status()
                     logger.info(f"Setting {self.DIRECTIONS[self.current_direction]} to GREEN")
                 
                 # Calculate green time for current direction
                 green_time = self._calculate_green_time(self.current_direction)
                 
-                logger.info(f"✅ {self.DIRECTIONS[self.current_direction]} GREEN for {green_time:.1f}s (vehicles: {self.vehicle_counts[self.DIRECTIONS[self.current_direction]]})")
+                logger.info(f"✅ {self.DIRECTIONS[self.current_direction]} GREEN for {green_time:.1f}s (vehicles: {self.vehicle_counts[self.current_direction]})")
                 
-                # Wait for green time
-                start_time = time.time()
-                while time.time() - start_time < green_time and self.mode == 'AUTO':
-                    # Check for interrupts (pedestrian priority)
-                    if any(self.pedestrian_requests.values()):
-                        # Allow current direction to finish minimum time
-                        if time.time() - start_time >= self.T_MIN:
-                            logger.info("Interrupting for pedestrian request")
-                            break
-                    
-                    time.sleep(0.5)
+                # Wait for green time (woken early by pedestrian requests / mode changes)
+                self._hold_green(green_time)
                 
                 if self.mode != 'AUTO':
                     continue
                 
                 # Update waiting cycles
-                for idx, direction in enumerate(self.DIRECTIONS):
-                    if idx == self.current_direction:
-                        self.waiting_cycles[direction] = 0
-                    else:
-                        self.waiting_cycles[direction] += 1
+                self.waiting_cycles += 1
+                self.waiting_cycles[self.current_direction] = 0
                 
                 # Select next direction
                 next_direction = self._select_next_direction()
                 
                 # Handle pedestrian request
-                if self.pedestrian_requests[self.DIRECTIONS[next_direction]]:
+                if self.pedestrian_requests[next_direction]:
                     self._serve_pedestrian(next_direction)
                 
                 # Execute transition
                 if next_direction != self.current_direction:
-                    self._execute_transition(self.current_direction, next_direction)
+                    if not self._execute_transition(self.current_direction, next_direction):
+                        continue
                 
                 self.current_direction = next_direction
-                self.stats['cycle_count'] += 1
+                self._count_stat('cycle_count')  # Also publishes the new current_direction
                 
             except Exception as e:
                 logger.error(f"Error in control loop: {e}", exc_info=True)
@@ -964,41 +1572,68 @@ class TrafficController:
         logger.info("Control loop stopped")
     
     def _log_event(self, event_type, message):
-        """Log system event"""
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        event = {
-            'timestamp': timestamp,
-            'type': event_type,
-            'message': message
-        }
+        """Log system event (formatting is deferred to get_event_log)"""
+        entry = (time.time(), event_type, message)
+        with self._event_lock:
+            # Allocating, writing and counting together keeps _event_count monotonic
+            # when several threads log at once
+            seq = next(self._event_seq)
+            self.event_log[seq % self.EVENT_LOG_SIZE] = entry
+            self._event_count = seq + 1
+    
+    def _as_direction_dict(self, values):
+        """Convert a per-direction array to a JSON-friendly {direction: value} dict"""
+        return dict(zip(self.DIRECTIONS, values.tolist()))
+    
+    def _publish_status(self):
+        """
+        Mark the status snapshot stale
         
-        with self.lock:
-            self.event_log.append(event)
+        Called after every state change (up to detection frame rate); the
+        snapshot itself is only rebuilt when someone reads the status.
+        """
+        self._status_dirty = True
+    
+    def _count_stat(self, name):
+        """Increment a self.stats counter and mark the status snapshot stale"""
+        self.stats[name] += 1
+        self._publish_status()
+    
+    def _current_snapshot(self):
+        """
+        Get the latest immutable StatusSnapshot, rebuilding it if stale (RCU-style)
+        
+        Publishing is a single attribute store, so readers see either the old
+        or the new snapshot, never a mix. The dirty flag is cleared before
+        rebuilding, so a write that races with the rebuild marks it stale again.
+        """
+        if not self._status_dirty:
+            return self._snapshot
+        
+        self._status_dirty = False
+        self._snapshot = snapshot = StatusSnapshot(
+            mode=self.mode,
+            current_state=self._simple_state if self.mode == 'SIMPLE' else self.current_state,
+            current_direction=self.DIRECTIONS[self.current_direction],
+            current_direction_idx=self.current_direction,
+            vehicle_counts=self._as_direction_dict(self.vehicle_counts),
+            total_vehicles=self._total,
+            waiting_cycles=self._as_direction_dict(self.waiting_cycles),
+            pedestrian_requests=self._as_direction_dict(self.pedestrian_requests),
+            statistics=self.stats.copy()
+        )
+        return snapshot
     
     def get_status(self):
-        """Get current system status"""
-        with self.lock:
-            # Get current LED state based on mode
-            if self.mode == 'SIMPLE':
-                current_led_state = self._simple_state
-            else:
-                current_led_state = self.current_state
-            
-            status = {
-                'mode': self.mode,
-                'current_state': current_led_state,
-                'current_direction': self.DIRECTIONS[self.current_direction],
-                'current_direction_idx': self.current_direction,
-                'vehicle_counts': self.vehicle_counts.copy(),
-                'total_vehicles': sum(self.vehicle_counts.values()),
-                'waiting_cycles': self.waiting_cycles.copy(),
-                'pedestrian_requests': self.pedestrian_requests.copy(),
-                'led_states': self.led_controller.get_all_states(),
-                'led_state': current_led_state,
-                'statistics': self.stats.copy(),
-                'is_peak_hour': self._is_peak_hour(),
-                'is_night_mode': self._is_night_mode()
-            }
+        """Get current system status (lock-free, from the latest snapshot)"""
+        snapshot = self._current_snapshot()
+        is_peak_hour, is_night_mode = self._time_flags()
+        
+        status = snapshot._asdict()
+        status['led_states'] = self.led_controller.get_all_states()
+        status['led_state'] = snapshot.current_state
+        status['is_peak_hour'] = is_peak_hour
+        status['is_night_mode'] = is_night_mode
         
         return status
     
@@ -1010,20 +1645,48 @@ class TrafficController:
             limit: Maximum number of events to return
             
         Returns:
-            List of event dicts
+            List of event dicts, oldest first
         """
-        with self.lock:
-            return list(self.event_log)[-limit:]
+        end = self._event_count
+        start = max(0, end - min(limit, self.EVENT_LOG_SIZE))
+        
+        events = []
+        for seq in range(start, end):
+            entry = self.event_log[seq % self.EVENT_LOG_SIZE]
+            if entry is None:
+                continue
+            timestamp, event_type, message = entry
+            events.append({
+                'timestamp': self._format_timestamp(timestamp),
+                'type': event_type,
+                'message': message
+            })
+        return events
+    
+    def _format_timestamp(self, timestamp):
+        """Format an epoch timestamp as local 'YYYY-mm-dd HH:MM:SS', cached per second"""
+        second = int(timestamp)
+        cached = self._ts_cache
+        if cached[0] != second:
+            cached = (second, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second)))
+            self._ts_cache = cached
+        return cached[1]
     
     def emergency_stop(self):
         """Emergency stop - set all lights to red"""
         logger.warning("EMERGENCY STOP activated")
         self._log_event("EMERGENCY", "All lights set to RED")
         
-        self.led_controller.set_all_red()
-        
-        with self.lock:
-            self.mode = 'MANUAL'
+        # Leave AUTO first so any in-flight transition aborts at its next step,
+        # then set red while holding the transition lock
+        with self._transition_lock:
+            with self.lock:
+                self.mode = 'MANUAL'
+            self._cancel_simple_transitions()
+            self._led_now('set_all_red')
+            self.current_state = 'RED'
+        self._publish_status()
+        self._control_event.set()
     
     def get_algorithm_settings(self):
         """
@@ -1084,73 +1747,27 @@ class TrafficController:
         """
         updated = []
         
-        # Timing settings
-        if 'timing' in settings:
-            t = settings['timing']
-            if 'T_MIN' in t:
-                self.T_MIN = max(5, min(30, int(t['T_MIN'])))
-                updated.append('T_MIN')
-            if 'T_MAX' in t:
-                self.T_MAX = max(30, min(120, int(t['T_MAX'])))
-                updated.append('T_MAX')
-            if 'T_PER_VEHICLE' in t:
-                self.T_PER_VEHICLE = max(1, min(10, int(t['T_PER_VEHICLE'])))
-                updated.append('T_PER_VEHICLE')
-        
-        # Pedestrian settings
-        if 'pedestrian' in settings:
-            p = settings['pedestrian']
-            if 'T_PEDESTRIAN' in p:
-                self.T_PEDESTRIAN = max(5, min(30, int(p['T_PEDESTRIAN'])))
-                updated.append('T_PEDESTRIAN')
-            if 'T_PEDESTRIAN_COOLDOWN' in p:
-                self.T_PEDESTRIAN_COOLDOWN = max(10, min(120, int(p['T_PEDESTRIAN_COOLDOWN'])))
-                updated.append('T_PEDESTRIAN_COOLDOWN')
-            if 'T_PEDESTRIAN_MIN_WAIT' in p:
-                self.T_PEDESTRIAN_MIN_WAIT = max(5, min(60, int(p['T_PEDESTRIAN_MIN_WAIT'])))
-                updated.append('T_PEDESTRIAN_MIN_WAIT')
-            if 'T_PEDESTRIAN_MAX_WAIT' in p:
-                self.T_PEDESTRIAN_MAX_WAIT = max(30, min(300, int(p['T_PEDESTRIAN_MAX_WAIT'])))
-                updated.append('T_PEDESTRIAN_MAX_WAIT')
-        
-        # Car priority settings
-        if 'car_priority' in settings:
-            c = settings['car_priority']
-            if 'T_CAR_MIN_GREEN' in c:
-                self.T_CAR_MIN_GREEN = max(5, min(30, int(c['T_CAR_MIN_GREEN'])))
-                updated.append('T_CAR_MIN_GREEN')
-            if 'T_CAR_EXTENSION' in c:
-                self.T_CAR_EXTENSION = max(1, min(15, int(c['T_CAR_EXTENSION'])))
-                updated.append('T_CAR_EXTENSION')
-            if 'T_CAR_WAITING_BONUS' in c:
-                self.T_CAR_WAITING_BONUS = max(0, min(10, int(c['T_CAR_WAITING_BONUS'])))
-                updated.append('T_CAR_WAITING_BONUS')
-        
-        # Priority lane settings
-        if 'priority_lane' in settings:
-            pl = settings['priority_lane']
-            if 'enabled' in pl:
-                self.PRIORITY_LANE_ENABLED = bool(pl['enabled'])
-                updated.append('PRIORITY_LANE_ENABLED')
-            if 'direction' in pl and pl['direction'] in self.DIRECTIONS:
-                self.PRIORITY_LANE_DIRECTION = pl['direction']
-                updated.append('PRIORITY_LANE_DIRECTION')
-            if 'multiplier' in pl:
-                self.PRIORITY_LANE_MULTIPLIER = max(1.0, min(3.0, float(pl['multiplier'])))
-                updated.append('PRIORITY_LANE_MULTIPLIER')
-            if 'min_vehicles' in pl:
-                self.PRIORITY_LANE_MIN_VEHICLES = max(1, min(10, int(pl['min_vehicles'])))
-                updated.append('PRIORITY_LANE_MIN_VEHICLES')
-        
-        # Balancing settings
-        if 'balancing' in settings:
-            b = settings['balancing']
-            if 'enabled' in b:
-                self.BALANCE_ENABLED = bool(b['enabled'])
-                updated.append('BALANCE_ENABLED')
-            if 'max_wait_cycles' in b:
-                self.MAX_WAIT_CYCLES = max(1, min(10, int(b['max_wait_cycles'])))
-                updated.append('MAX_WAIT_CYCLES')
+        # Numeric settings, clamped to their allowed range
+        for section, key, attr, cast, lo, hi in self._SETTING_SPECS:
+            values = settings.get(section)
+            if values and key in values:
+                setattr(self, attr, max(lo, min(hi, cast(values[key]))))
+                updated.append(attr)
+        
+        # On/off switches
+        for section, key, attr in self._SETTING_FLAGS:
+            values = settings.get(section)
+            if values and key in values:
+                setattr(self, attr, bool(values[key]))
+                updated.append(attr)
+        
+        # Priority lane direction must be a known direction
+        pl = settings.get('priority_lane')
+        if pl and 'direction' in pl and pl['direction'] in self.DIRECTIONS:
+            self.PRIORITY_LANE_DIRECTION = pl['direction']
+            updated.append('PRIORITY_LANE_DIRECTION')
+        
+        self._rebuild_prio_mul()
         
         logger.info(f"Algorithm settings updated: {updated}")
         self._log_event("SYSTEM", f"Algorithm settings updated: {', '.join(updated)}")
@@ -1172,19 +1789,19 @@ class TrafficController:
         self.update_waiting_times()
         
         # Calculate scores for each direction
+        scores = self._score_all()
         direction_details = {}
-        for direction in self.DIRECTIONS:
-            score = self.calculate_direction_priority_score(direction)
+        for idx, direction in enumerate(self.DIRECTIONS):
             speed = self.estimate_vehicle_speed(direction)
             
             direction_details[direction] = {
-                'vehicles': self.vehicle_counts[direction],
-                'waiting_time_seconds': self.car_waiting_time[direction],
-                'waiting_cycles': self.waiting_cycles[direction],
-                'priority_score': round(score, 1),
+                'vehicles': int(self.vehicle_counts[idx]),
+                'waiting_time_seconds': float(self.car_waiting_time[idx]),
+                'waiting_cycles': int(self.waiting_cycles[idx]),
+                'priority_score': round(float(scores[idx]), 1),
                 'vehicle_speed': round(speed, 2),
-                'pedestrian_request': self.pedestrian_requests[direction],
-                'pedestrian_waiting': self.pedestrian_waiting_time.get(direction, 0)
+                'pedestrian_request': bool(self.pedestrian_requests[idx]),
+                'pedestrian_waiting': float(self.pedestrian_waiting_time[idx])
             }
         
         return {
@@ -1192,7 +1809,7 @@ class TrafficController:
             'current_state': self.current_state,
             'current_direction': self.DIRECTIONS[self.current_direction],
             'directions': direction_details,
-            'total_vehicles': sum(self.vehicle_counts.values()),
+            'total_vehicles': self._total,
             'settings': {
                 'priority_lane_enabled': self.PRIORITY_LANE_ENABLED,
                 'priority_lane_direction': self.PRIORITY_LANE_DIRECTION,
@@ -1,37 +1,80 @@
+import os
 import threading
 import logging
+import torch
 from ultralytics import YOLO
 import cv2
 import numpy as np
+from scipy.optimize import linear_sum_assignment
+from scipy.spatial.distance import cdist
 from collections import defaultdict, deque
 import time
 
 logger = logging.getLogger(__name__)
 
+# Serializes NCNN exports (ultralytics may pip-install ncnn/pnnx on the fly)
+_export_lock = threading.Lock()
+
 
 class VehicleTracker:
     """
     Simple vehicle tracking using centroid tracking
     Assigns unique IDs to vehicles and tracks them across frames
+    
+    Tracked objects are kept as parallel NumPy arrays (struct-of-arrays):
+    object_ids[i], centroids[i] and disappeared[i] describe the same vehicle.
     """
+    
+    MAX_MATCH_DISTANCE = 50  # pixels - farther detections are treated as new vehicles
+    
     def __init__(self, max_disappeared=30):
         self.next_id = 0
-        self.objects = {}  # ID -> centroid
-        self.disappeared = {}  # ID -> frames disappeared
+        self.object_ids = np.empty(0, dtype=np.int64)
+        self.centroids = np.empty((0, 2), dtype=np.float64)
+        self.disappeared = np.empty(0, dtype=np.int32)  # Frames since last matched
         self.max_disappeared = max_disappeared
         self.vehicle_count_history = deque(maxlen=100)  # Last 100 frame counts
+    
+    @property
+    def objects(self):
+        """Tracked objects as {object_id: centroid}"""
+        return dict(zip(self.object_ids.tolist(), map(tuple, self.centroids.tolist())))
         
     def register(self, centroid):
         """Register a new object with unique ID"""
-        self.objects[self.next_id] = centroid
-        self.disappeared[self.next_id] = 0
-        self.next_id += 1
-        return self.next_id - 1
+        return self._register_many([centroid])[0]
+    
+    def _register_many(self, centroids):
+        """
+        Register several new objects at once
+        
+        Returns:
+            List of the new object IDs
+        """
+        new_ids = np.arange(self.next_id, self.next_id + len(centroids), dtype=np.int64)
+        self.next_id += len(centroids)
+        
+        self.object_ids = np.concatenate((self.object_ids, new_ids))
+        self.centroids = np.concatenate((self.centroids, np.asarray(centroids, dtype=np.float64).reshape(-1, 2)))
+        self.disappeared = np.concatenate((self.disappeared, np.zeros(len(centroids), dtype=np.int32)))
+        return new_ids.tolist()
     
     def deregister(self, object_id):
         """Remove object from tracking"""
-        del self.objects[object_id]
-        del self.disappeared[object_id]
+        self._keep(self.object_ids != object_id)
+    
+    def _keep(self, mask):
+        """Keep only the objects selected by a boolean mask"""
+        self.object_ids = self.object_ids[mask]
+        self.centroids = self.centroids[mask]
+        self.disappeared = self.disappeared[mask]
+    
+    def _age_unmatched(self, unmatched):
+        """Count a missed frame for the masked objects and drop the ones gone too long"""
+        self.disappeared[unmatched] += 1
+        expired = self.disappeared > self.max_disappeared
+        if expired.any():
+            self._keep(~expired)
     
     def update(self, detections):
         """
@@ -45,74 +88,51 @@ class VehicleTracker:
         """
         # If no detections, mark all as disappeared
         if len(detections) == 0:
-            for object_id in list(self.disappeared.keys()):
-                self.disappeared[object_id] += 1
-                
-                if self.disappeared[object_id] > self.max_disappeared:
-                    self.deregister(object_id)
-            
+            self._age_unmatched(slice(None))
             return {}
         
+        detection_centroids = [d[0] for d in detections]
+        
         # If no existing objects, register all as new
-        if len(self.objects) == 0:
-            result = {}
-            for detection in detections:
-                centroid, bbox = detection
-                obj_id = self.register(centroid)
-                result[obj_id] = (centroid, bbox)
-            return result
-        
-        # Match existing objects to new detections
-        object_ids = list(self.objects.keys())
-        object_centroids = list(self.objects.values())
+        if len(self.object_ids) == 0:
+            new_ids = self._register_many(detection_centroids)
+            return {obj_id: detection for obj_id, detection in zip(new_ids, detections)}
         
-        detection_centroids = [d[0] for d in detections]
+        det_arr = np.asarray(detection_centroids, dtype=np.float64)
         
-        # Compute distance matrix
-        distances = np.zeros((len(object_centroids), len(detection_centroids)))
-        for i, obj_centroid in enumerate(object_centroids):
-            for j, det_centroid in enumerate(detection_centroids):
-                distances[i, j] = np.linalg.norm(
-                    np.array(obj_centroid) - np.array(det_centroid)
-                )
+        # Compute squared distance matrix in one call (same ordering as plain
+        # distances, without the sqrt)
+        distances = cdist(self.centroids, det_arr, 'sqeuclidean')
         
-        # Match using minimum distance
-        rows = distances.min(axis=1).argsort()
-        cols = distances.argmin(axis=1)[rows]
+        # Globally optimal matching (Hungarian); pairs beyond MAX_MATCH_DISTANCE
+        # get a prohibitive cost so they never displace a valid pair
+        max_dist_sq = self.MAX_MATCH_DISTANCE ** 2
+        costs = np.where(distances < max_dist_sq, distances, 1e9)
+        rows, cols = linear_sum_assignment(costs)
+        matched = costs[rows, cols] < max_dist_sq
+        rows = rows[matched]
+        cols = cols[matched]
         
-        used_rows = set()
-        used_cols = set()
-        result = {}
+        self.centroids[rows] = det_arr[cols]
+        self.disappeared[rows] = 0
         
-        for row, col in zip(rows, cols):
-            if row in used_rows or col in used_cols:
-                continue
-            
-            # If distance is reasonable, match them
-            if distances[row, col] < 50:  # pixels
-                object_id = object_ids[row]
-                self.objects[object_id] = detection_centroids[col]
-                self.disappeared[object_id] = 0
-                result[object_id] = (detection_centroids[col], detections[col][1])
-                
-                used_rows.add(row)
-                used_cols.add(col)
+        result = {}
+        for obj_id, col in zip(self.object_ids[rows].tolist(), cols.tolist()):
+            result[obj_id] = (detection_centroids[col], detections[col][1])
         
         # Handle unmatched objects (disappeared)
-        unused_rows = set(range(len(object_centroids))) - used_rows
-        for row in unused_rows:
-            object_id = object_ids[row]
-            self.disappeared[object_id] += 1
-            
-            if self.disappeared[object_id] > self.max_disappeared:
-                self.deregister(object_id)
+        unmatched = np.ones(len(self.object_ids), dtype=bool)
+        unmatched[rows] = False
+        self._age_unmatched(unmatched)
         
         # Register new detections
-        unused_cols = set(range(len(detections))) - used_cols
-        for col in unused_cols:
-            centroid, bbox = detections[col]
-            obj_id = self.register(centroid)
-            result[obj_id] = (centroid, bbox)
+        new_cols = np.ones(len(detections), dtype=bool)
+        new_cols[cols] = False
+        new_cols = np.flatnonzero(new_cols).tolist()
+        if new_cols:
+            new_ids = self._register_many([detection_centroids[col] for col in new_cols])
+            for obj_id, col in zip(new_ids, new_cols):
+                result[obj_id] = detections[col]
         
         return result
 
@@ -132,6 +152,16 @@ class YOLODetector:
         7: 'truck'
     }
     
+    _vehicle_class_ids = np.array(list(VEHICLE_CLASSES), dtype=np.int32)  # For box filtering
+    
+    # BGR drawing color per direction (ROI zones and vehicle boxes)
+    DIRECTION_COLORS = {
+        'NORTH': (255, 0, 0),    # Blue
+        'EAST': (0, 255, 0),     # Green
+        'SOUTH': (0, 0, 255),    # Red
+        'WEST': (255, 255, 0)    # Cyan
+    }
+    
     # Emergency vehicle detection (visual cues)
     # We detect based on color patterns typical of emergency vehicles
     EMERGENCY_COLORS = {
@@ -140,6 +170,8 @@ class YOLODetector:
         'fire': [(255, 0, 0), (255, 255, 0)]           # Red and yellow
     }
     
+    EMERGENCY_COOLDOWN_FRAMES = 300  # ~10 seconds at 30fps between emergency triggers
+    
     def __init__(self, model_name='yolov8n.pt'):
         """
         Initialize YOLO detector with tracking
@@ -150,6 +182,7 @@ class YOLODetector:
         self.model = None
         self.model_name = model_name
         self.lock = threading.Lock()
+        self._load_lock = threading.Lock()
         self.is_loaded = False
         
         # Tracking
@@ -172,6 +205,8 @@ class YOLODetector:
             'WEST': (0.0, 0.5, 0.5, 1.0)      # Bottom-left quadrant
         }
         
+        self._rebuild_roi_array()
+        
         # Performance metrics
         self.fps = 0
         self.last_time = time.time()
@@ -180,23 +215,93 @@ class YOLODetector:
         # Detection confidence threshold
         self.confidence_threshold = 0.5
         
+        # Static-scene gate: skip YOLO while a 32x32 grayscale thumbnail stays
+        # within STATIC_DIFF_THRESHOLD (per cell) of the last inferred frame
+        self.STATIC_DIFF_THRESHOLD = 10
+        self._ref_thumb = (None, None)  # (frame shape, thumbnail) of the last inferred frame
+        self._last_detections = []
+        
+        # YOLO input size; also the fixed input size of the exported NCNN model.
+        # Frames are downscaled to this before inference (cars span tens of
+        # pixels, so more resolution buys nothing but compute)
+        self.INFERENCE_IMGSZ = 416
+        
         # Emergency vehicle detection
         self.emergency_detected = False
         self.emergency_direction = None
         self.emergency_cooldown = 0  # Frames since last emergency
         
+    def _ncnn_path(self, model_path):
+        """Directory of the NCNN export for `model_path` at INFERENCE_IMGSZ"""
+        return f"{os.path.splitext(model_path)[0]}_{self.INFERENCE_IMGSZ}_ncnn_model"
+    
+    def export_ncnn(self):
+        """
+        Export the .pt weights to NCNN FP16 (fast ARM CPU inference on RPi5)
+        
+        Run once ahead of serving (`python manage.py export_ncnn`): the export
+        needs ncnn/pnnx and takes a while, so it never runs on a request.
+        Returns the export directory, or None if the export isn't possible.
+        """
+        if not self.model_name.endswith('.pt'):
+            return None
+        
+        ncnn_path = self._ncnn_path(self.model_name)
+        with _export_lock:
+            if os.path.isdir(ncnn_path):
+                return ncnn_path
+            
+            try:
+                logger.info(f"Exporting {self.model_name} to NCNN FP16 (one-time)")
+                exported = YOLO(self.model_name).export(format='ncnn', half=True, imgsz=self.INFERENCE_IMGSZ)
+                os.replace(exported, ncnn_path)
+                return ncnn_path
+            except Exception as e:
+                logger.warning(f"NCNN export failed: {e}")
+                return None
+    
+    def _resolve_model_path(self, model_path):
+        """
+        Prefer the NCNN export of the .pt weights if one exists
+        
+        Falls back to the PyTorch weights otherwise (see export_ncnn()).
+        """
+        if not model_path.endswith('.pt'):
+            return model_path
+        
+        ncnn_path = self._ncnn_path(model_path)
+        if os.path.isdir(ncnn_path):
+            return ncnn_path
+        
+        logger.info(f"No NCNN export at {ncnn_path}, using {model_path} (run: python manage.py export_ncnn)")
+        return model_path
+    
     def load_model(self):
-        """Load YOLO model"""
-        try:
-            logger.info(f"Loading YOLO model: {self.model_name}")
-            self.model = YOLO(self.model_name)
-            self.is_loaded = True
-            logger.info("YOLO model loaded successfully")
-            return True
-        except Exception as e:
-            logger.error(f"Failed to load YOLO model: {e}")
-            self.is_loaded = False
-            return False
+        """Load YOLO model (once - concurrent callers wait for the first load)"""
+        with self._load_lock:
+            if self.is_loaded:
+                return True
+            
+            try:
+                model_path = self._resolve_model_path(self.model_name)
+                logger.info(f"Loading YOLO model: {model_path}")
+                self.model = YOLO(model_path, task='detect')
+                
+                # Warm-up: builds the predictor and allocates its buffers before the first real frame
+                self._infer(np.zeros((self.INFERENCE_IMGSZ, self.INFERENCE_IMGSZ, 3), dtype=np.uint8))
+                
+                self.is_loaded = True
+                logger.info("YOLO model loaded successfully")
+                return True
+            except Exception as e:
+                logger.error(f"Failed to load YOLO model: {e}")
+                self.is_loaded = False
+                return False
+    
+    def _infer(self, source):
+        """Run YOLO under torch.inference_mode (the model keeps reusing its predictor)"""
+        with torch.inference_mode():
+            return self.model(source, verbose=False, conf=self.confidence_threshold, imgsz=self.INFERENCE_IMGSZ)
     
     def set_roi(self, direction, x1, y1, x2, y2):
         """
@@ -208,20 +313,60 @@ class YOLODetector:
         """
         if direction in self.roi_zones:
             self.roi_zones[direction] = (x1, y1, x2, y2)
+            self._rebuild_roi_array()
             logger.info(f"ROI set for {direction}: {self.roi_zones[direction]}")
     
-    def _is_in_roi(self, centroid, frame_shape, direction):
-        """Check if centroid is within ROI for a direction"""
-        h, w = frame_shape[:2]
-        cx, cy = centroid
+    def _rebuild_roi_array(self):
+        """Stack roi_zones into an (n, 4) array for vectorized lookups (call after changing zones)"""
+        self._roi_names = tuple(self.roi_zones)
+        self._roi_array = np.array([self.roi_zones[d] for d in self._roi_names], dtype=np.float64)
+        self._roi_overlay_cache = (None, None)
+    
+    def _roi_overlay(self, w, h):
+        """
+        Pixel geometry for drawing the ROI zones, cached per frame size
         
-        # Normalize centroid
-        cx_norm = cx / w
-        cy_norm = cy / h
+        Returns:
+            List of (direction, pt1, pt2, label_pos, color) tuples
+        """
+        size, overlay = self._roi_overlay_cache
+        if size != (w, h):
+            overlay = []
+            for direction, (x1, y1, x2, y2) in self.roi_zones.items():
+                pt1 = (int(x1 * w), int(y1 * h))
+                pt2 = (int(x2 * w), int(y2 * h))
+                label_pos = (pt1[0] + 5, pt1[1] + 20)
+                overlay.append((direction, pt1, pt2, label_pos, self.DIRECTION_COLORS[direction]))
+            self._roi_overlay_cache = ((w, h), overlay)
+        return overlay
+    
+    def _roi_directions(self, centroids, frame_shape):
+        """
+        Find the ROI zone of each centroid in one vectorized pass
+        
+        Args:
+            centroids: List of (cx, cy) pixel centroids
+            frame_shape: Frame shape (h, w, ...)
+            
+        Returns:
+            List with the first matching direction per centroid (None if outside all zones)
+        """
+        if not centroids:
+            return []
         
-        x1, y1, x2, y2 = self.roi_zones[direction]
+        h, w = frame_shape[:2]
+        points = np.asarray(centroids, dtype=np.float64) / (w, h)
+        x = points[:, 0:1]
+        y = points[:, 1:2]
+        roi = self._roi_array
+        
+        # (n_centroids, n_zones) containment matrix
+        inside = (roi[:, 0] <= x) & (x <= roi[:, 2]) & (roi[:, 1] <= y) & (y <= roi[:, 3])
+        first = inside.argmax(axis=1).tolist()
+        hit = inside.any(axis=1).tolist()
         
-        return x1 <= cx_norm <= x2 and y1 <= cy_norm <= y2
+        names = self._roi_names
+        return [names[idx] if ok else None for idx, ok in zip(first, hit)]
     
     def _calculate_centroid(self, bbox):
         """Calculate centroid from bounding box"""
@@ -301,13 +446,85 @@ class YOLODetector:
             logger.debug(f"Emergency detection error: {e}")
             return False, None
     
-    def detect_vehicles(self, frame, draw_roi=True):
+    def _downscale(self, frame, size):
+        """
+        Resize frame so its long side is at most `size` (aspect ratio preserved)
+        
+        Returns:
+            Tuple of (resized_frame, scale) where scale = resized / original
+        """
+        h, w = frame.shape[:2]
+        scale = size / max(h, w)
+        if scale >= 1.0:
+            return frame, 1.0
+        
+        resized = cv2.resize(frame, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA)
+        return resized, scale
+    
+    def _scene_unchanged(self, thumb, frame_shape):
+        """
+        Check whether a frame thumbnail matches the last inferred frame
+        
+        Compared against the last *inferred* frame (not the previous one), so a
+        slowly moving vehicle still adds up to a change. Uses the largest
+        per-cell difference so a single small vehicle is enough to trigger.
+        
+        Args:
+            thumb: 32x32 grayscale thumbnail of the current frame
+            frame_shape: Shape of the current frame (reused boxes must still fit)
+            
+        Returns:
+            bool: True if YOLO can be skipped for this frame
+        """
+        ref_shape, ref = self._ref_thumb
+        if ref is None or ref_shape != frame_shape:
+            return False
+        return int(cv2.absdiff(thumb, ref).max()) < self.STATIC_DIFF_THRESHOLD
+    
+    def _parse_vehicles(self, result, scale=1.0):
+        """
+        Extract vehicle detections from a single YOLO result
+        
+        Class ids and boxes are pulled out as NumPy arrays once and filtered
+        with a mask, instead of converting every box to Python scalars.
+        
+        Args:
+            result: YOLO result
+            scale: Inference frame size / original frame size (boxes are mapped back)
+            
+        Returns:
+            List of (centroid, bbox) tuples for vehicle-class boxes
+        """
+        boxes = result.boxes
+        if len(boxes) == 0:
+            return []
+        
+        class_ids = boxes.cls.cpu().numpy().astype(np.int32)
+        mask = np.isin(class_ids, self._vehicle_class_ids)
+        if not mask.any():
+            return []
+        
+        xyxy = boxes.xyxy.cpu().numpy()[mask]
+        if scale != 1.0:
+            xyxy = xyxy / scale
+        xyxy = xyxy.astype(np.int32)
+        centroids = (xyxy[:, :2] + xyxy[:, 2:]) / 2.0
+        return [
+            ((cx, cy), (x1, y1, x2, y2))
+            for (cx, cy), (x1, y1, x2, y2) in zip(centroids.tolist(), xyxy.tolist())
+        ]
+    
+    def detect_vehicles(self, frame, draw_roi=True, mutate_in_place=False, reuse_detections=False):
         """
         Detect and track vehicles in frame with ROI support
         
         Args:
             frame: Input frame (BGR)
             draw_roi: Whether to draw ROI zones on frame
+            mutate_in_place: Draw annotations directly on `frame` instead of a copy
+                (use when the caller owns the frame, e.g. VideoCamera.get_frame())
+            reuse_detections: Skip YOLO and annotate/track the last inferred
+                detections (the caller knows this frame can't change anything)
             
         Returns:
             Tuple of (annotated_frame, direction_counts_dict, tracked_objects)
@@ -316,119 +533,102 @@ class YOLODetector:
             return frame, self.direction_counts, {}
         
         try:
-            # Run YOLO inference
-            results = self.model(frame, verbose=False, conf=self.confidence_threshold)
+            thumb = cv2.cvtColor(cv2.resize(frame, (32, 32), interpolation=cv2.INTER_AREA), cv2.COLOR_BGR2GRAY)
+            
+            if reuse_detections or self._scene_unchanged(thumb, frame.shape):
+                # Nothing moved since the last inference (or the caller asked) - reuse its detections
+                detections = self._last_detections
+            else:
+                # Run YOLO inference
+                # Downscale once here (long side -> INFERENCE_IMGSZ), scale boxes back afterwards
+                small, scale = self._downscale(frame, self.INFERENCE_IMGSZ)
+                results = self._infer(small)
+                
+                # Process detections
+                detections = self._parse_vehicles(results[0], scale) if results else []
+                self._last_detections = detections
+                self._ref_thumb = (frame.shape, thumb)
             
             # Reset direction counts
             for direction in self.direction_counts:
                 self.direction_counts[direction] = 0
             
-            annotated_frame = frame.copy()
             h, w = frame.shape[:2]
             
+            # Update tracker
+            tracked_objects = self.tracker.update(detections)
+            
+            # Check for emergency vehicles before anything is drawn, so the
+            # color check never sees our own annotations when drawing in place
+            emergency_checks = {
+                obj_id: self._detect_emergency_vehicle(frame, bbox)
+                for obj_id, (centroid, bbox) in tracked_objects.items()
+            }
+            
+            annotated_frame = frame if mutate_in_place else frame.copy()
+            
             # Draw ROI zones if requested
             if draw_roi:
-                colors = {
-                    'NORTH': (255, 0, 0),    # Blue
-                    'EAST': (0, 255, 0),     # Green
-                    'SOUTH': (0, 0, 255),    # Red
-                    'WEST': (255, 255, 0)    # Cyan
-                }
-                
-                for direction, (x1, y1, x2, y2) in self.roi_zones.items():
-                    pt1 = (int(x1 * w), int(y1 * h))
-                    pt2 = (int(x2 * w), int(y2 * h))
-                    cv2.rectangle(annotated_frame, pt1, pt2, colors[direction], 2)
+                for direction, pt1, pt2, label_pos, color in self._roi_overlay(w, h):
+                    cv2.rectangle(annotated_frame, pt1, pt2, color, 2)
                     
                     # Add label
-                    label_pos = (pt1[0] + 5, pt1[1] + 20)
                     cv2.putText(
                         annotated_frame,
                         direction,
                         label_pos,
                         cv2.FONT_HERSHEY_SIMPLEX,
                         0.6,
-                        colors[direction],
+                        color,
                         2
                     )
             
-            # Process detections
-            detections = []
-            
-            if results and len(results) > 0:
-                result = results[0]
-                
-                for box in result.boxes:
-                    class_id = int(box.cls[0])
-                    confidence = float(box.conf[0])
-                    
-                    # Filter for vehicle classes
-                    if class_id in self.VEHICLE_CLASSES:
-                        x1, y1, x2, y2 = map(int, box.xyxy[0])
-                        bbox = (x1, y1, x2, y2)
-                        centroid = self._calculate_centroid(bbox)
-                        
-                        detections.append((centroid, bbox))
-            
-            # Update tracker
-            tracked_objects = self.tracker.update(detections)
-            
             # Reset emergency status
             self.emergency_detected = False
             self.emergency_direction = None
             self.emergency_cooldown += 1
             
             # Count vehicles per direction and draw annotations
-            for obj_id, (centroid, bbox) in tracked_objects.items():
+            # (each vehicle counts in its first matching ROI zone only)
+            directions = self._roi_directions([centroid for centroid, _ in tracked_objects.values()], frame.shape)
+            for (obj_id, (centroid, bbox)), direction in zip(tracked_objects.items(), directions):
+                if direction is None:
+                    continue
                 x1, y1, x2, y2 = bbox
                 
-                # Check for emergency vehicle
-                is_emergency, emergency_type = self._detect_emergency_vehicle(frame, bbox)
+                # Emergency vehicle check (done above, before drawing)
+                is_emergency, emergency_type = emergency_checks[obj_id]
+                
+                self.direction_counts[direction] += 1
+                
+                # Use special color for emergency vehicles
+                # Only trigger emergency if cooldown has passed (prevent spam)
+                if is_emergency and self.emergency_cooldown > self.EMERGENCY_COOLDOWN_FRAMES:
+                    color = (0, 0, 255)  # Bright red for emergency
+                    self.emergency_detected = True
+                    self.emergency_direction = direction
+                    self.emergency_cooldown = 0  # Reset cooldown
+                    logger.warning(f"🚨 EMERGENCY VEHICLE ({emergency_type}) detected in {direction}!")
+                elif is_emergency:
+                    # Emergency detected but in cooldown
+                    color = (128, 0, 255)  # Purple = emergency but on cooldown
+                    logger.debug(f"Emergency on cooldown: {self.emergency_cooldown}/{self.EMERGENCY_COOLDOWN_FRAMES}")
+                else:
+                    color = self.DIRECTION_COLORS[direction]
+                
+                cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 2 if not is_emergency else 4)
+                
+                # Draw ID and direction (with EMERGENCY label)
+                if is_emergency:
+                    label = f"🚨 EMERGENCY {emergency_type.upper()}"
+                    cv2.putText(annotated_frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 3)
+                else:
+                    label = f"ID:{obj_id} {direction}"
+                    cv2.putText(annotated_frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
                 
-                # Determine which direction this vehicle is in
-                for direction in self.direction_counts:
-                    if self._is_in_roi(centroid, frame.shape, direction):
-                        self.direction_counts[direction] += 1
-                        
-                        # Draw bounding box with direction color
-                        colors = {
-                            'NORTH': (255, 0, 0),
-                            'EAST': (0, 255, 0),
-                            'SOUTH': (0, 0, 255),
-                            'WEST': (255, 255, 0)
-                        }
-                        
-                        # Use special color for emergency vehicles
-                        # Only trigger emergency if cooldown has passed (prevent spam)
-                        EMERGENCY_COOLDOWN_FRAMES = 300  # ~10 seconds at 30fps
-                        if is_emergency and self.emergency_cooldown > EMERGENCY_COOLDOWN_FRAMES:
-                            color = (0, 0, 255)  # Bright red for emergency
-                            self.emergency_detected = True
-                            self.emergency_direction = direction
-                            self.emergency_cooldown = 0  # Reset cooldown
-                            logger.warning(f"🚨 EMERGENCY VEHICLE ({emergency_type}) detected in {direction}!")
-                        elif is_emergency:
-                            # Emergency detected but in cooldown
-                            color = (128, 0, 255)  # Purple = emergency but on cooldown
-                            logger.debug(f"Emergency on cooldown: {self.emergency_cooldown}/{EMERGENCY_COOLDOWN_FRAMES}")
-                        else:
-                            color = colors[direction]
-                        
-                        cv2.rectangle(annotated_frame, (x1, y1), (x2, y2), color, 2 if not is_emergency else 4)
-                        
-                        # Draw ID and direction (with EMERGENCY label)
-                        if is_emergency:
-                            label = f"🚨 EMERGENCY {emergency_type.upper()}"
-                            cv2.putText(annotated_frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.7, (0, 0, 255), 3)
-                        else:
-                            label = f"ID:{obj_id} {direction}"
-                            cv2.putText(annotated_frame, label, (x1, y1 - 10), cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 2)
-                        
-                        # Draw centroid
-                        cx, cy = map(int, centroid)
-                        cv2.circle(annotated_frame, (cx, cy), 4, color, -1)
-                        
-                        break  # Vehicle counted in one direction only
+                # Draw centroid
+                cx, cy = map(int, centroid)
+                cv2.circle(annotated_frame, (cx, cy), 4, color, -1)
             
             # Calculate FPS
             self.frame_count += 1
@@ -469,12 +669,12 @@ class YOLODetector:
             return frame, self.direction_counts, {}
     
     # Legacy method for backward compatibility
-    def detect_cars(self, frame):
+    def detect_cars(self, frame, mutate_in_place=False):
         """
         Legacy method for backward compatibility
         Returns: (annotated_frame, total_car_count)
         """
-        annotated_frame, direction_counts, _ = self.detect_vehicles(frame, draw_roi=True)
+        annotated_frame, direction_counts, _ = self.detect_vehicles(frame, draw_roi=True, mutate_in_place=mutate_in_place)
         total_count = sum(direction_counts.values())
         return annotated_frame, total_count
     
@@ -524,3 +724,4 @@ class YOLODetector:
                     config.get('y2', 1)
                 )
                 logger.info(f"Zone {direction} configured: {self.roi_zones[direction]}")
+        self._rebuild_roi_array()
@@ -82,6 +82,11 @@ else
     echo "   ⚠️  Camera library not found (OK if not on Raspberry Pi)"
 fi
 
+# Prepare the NCNN model once (no-op if already exported)
+echo ""
+echo "📌 Preparing YOLO model..."
+python3 manage.py export_ncnn || echo "   ⚠️  NCNN export failed - falling back to PyTorch weights"
+
 # Ask for run mode
 echo ""
 echo "=============================================="